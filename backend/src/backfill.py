@@ -0,0 +1,218 @@
+"""
+Offline bulk triage from a JSONL (optionally gzip-compressed) dump of GitHub issues.
+
+Usage:
+    python -m src.backfill issues.jsonl.gz --repo owner/repo --workers 4
+
+Each line is a GitHub API issue object. Issues are classified and scored
+across a process pool and written with batched upserts. Progress is
+checkpointed after every batch, so an interrupted run resumes where it stopped.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.github_client import parse_issue
+from src.ml_model import IssueClassifier
+from src.priority_scorer import PriorityScorer
+from src.storage import create_storage
+
+logger = logging.getLogger("IssuePilot.backfill")
+
+REPO_URL_PATTERN = re.compile(r"/repos/([^/]+/[^/]+)$")
+
+# Per-process state, set up once by _init_worker
+_classifier: Optional[IssueClassifier] = None
+_scorer: Optional[PriorityScorer] = None
+
+
+def open_dump(path: str):
+    """Opens a JSONL dump as text, transparently handling gzip."""
+    with open(path, "rb") as f:
+        is_gzip = f.read(2) == b"\x1f\x8b"
+    if is_gzip:
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def read_issues(path: str, repository: str = None, skip_lines: int = 0) -> Iterator[Tuple[int, Optional[Dict]]]:
+    """
+    Streams (line_number, issue) pairs from a dump, starting after `skip_lines`.
+    `issue` is None for pull requests and malformed lines so callers can still
+    advance their checkpoint past them.
+    """
+    with open_dump(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if line_number <= skip_lines:
+                continue
+            line = line.strip()
+            if not line:
+                yield line_number, None
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Skipping malformed line {line_number}: {e}")
+                yield line_number, None
+                continue
+
+            issue = parse_issue(item)
+            if issue is not None:
+                match = REPO_URL_PATTERN.search(item.get("repository_url") or "")
+                issue["repository"] = repository or (match.group(1) if match else None)
+            yield line_number, issue
+
+
+def _init_worker():
+    global _classifier, _scorer
+    _classifier = IssueClassifier()
+    _classifier.load_model()
+    _scorer = PriorityScorer()
+
+
+def triage_chunk(issues: List[Dict]) -> List[Dict]:
+    """Classifies and scores a chunk of issues. Runs inside a pool worker."""
+    if _classifier is None:
+        _init_worker()
+    texts = [(issue.get("title") or "") + " " + (issue.get("body") or "") for issue in issues]
+    predictions = _classifier.predict(texts)
+    for issue, label in zip(issues, predictions):
+        issue["predicted_label"] = label
+        issue["priority_score"] = _scorer.calculate_score(issue)
+        issue["status"] = "triaged"
+    return issues
+
+
+def load_checkpoint(checkpoint_path: str, input_path: str) -> int:
+    if not os.path.exists(checkpoint_path):
+        return 0
+    with open(checkpoint_path, "r") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("input") != os.path.abspath(input_path):
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('input')}")
+    return checkpoint.get("line", 0)
+
+
+def save_checkpoint(checkpoint_path: str, input_path: str, line: int, written: int):
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"input": os.path.abspath(input_path), "line": line, "written": written}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _chunks(stream: Iterator[Tuple[int, Optional[Dict]]], chunk_size: int) -> Iterator[Tuple[int, List[Dict]]]:
+    """Groups issues into chunks, each tagged with the last input line it covers."""
+    chunk = []
+    last_line = None
+    for line_number, issue in stream:
+        last_line = line_number
+        if issue is not None:
+            chunk.append(issue)
+        if len(chunk) >= chunk_size:
+            yield last_line, chunk
+            chunk = []
+    if last_line is not None:
+        yield last_line, chunk
+
+
+def backfill(path: str, storage, repository: str = None, workers: int = None,
+             chunk_size: int = 500, batch_size: int = 5000, checkpoint_path: str = None,
+             resume: bool = True) -> Dict:
+    """
+    Runs the backfill and returns a summary with counts and throughput.
+    With workers <= 1 everything runs in the calling process.
+    """
+    workers = workers or os.cpu_count() or 1
+    checkpoint_path = checkpoint_path or path + ".checkpoint.json"
+    start_line = load_checkpoint(checkpoint_path, path) if resume else 0
+    if start_line:
+        logger.info(f"Resuming {path} after line {start_line}.")
+
+    written = 0
+    buffer: List[Dict] = []
+    buffer_line = start_line
+    checkpointed_line = start_line
+    started = time.perf_counter()
+
+    def flush():
+        nonlocal written, buffer, checkpointed_line
+        storage.bulk_upsert(buffer)
+        written += len(buffer)
+        buffer = []
+        # Only checkpoint lines whose issues are committed
+        save_checkpoint(checkpoint_path, path, buffer_line, written)
+        checkpointed_line = buffer_line
+        elapsed = time.perf_counter() - started
+        logger.info(f"{written} issues written ({written / max(elapsed, 1e-9):.1f} issues/s), checkpoint at line {buffer_line}.")
+
+    def collect(last_line: int, issues: List[Dict]):
+        nonlocal buffer_line
+        buffer.extend(issues)
+        buffer_line = last_line
+        if len(buffer) >= batch_size:
+            flush()
+
+    chunks = _chunks(read_issues(path, repository, skip_lines=start_line), chunk_size)
+    if workers <= 1:
+        for last_line, issues in chunks:
+            collect(last_line, triage_chunk(issues) if issues else issues)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            # Bounded in-flight window, consumed in input order so checkpoints stay monotonic
+            in_flight = deque()
+            for last_line, issues in chunks:
+                in_flight.append((last_line, pool.submit(triage_chunk, issues) if issues else None))
+                if len(in_flight) >= workers * 2:
+                    done_line, future = in_flight.popleft()
+                    collect(done_line, future.result() if future else [])
+            while in_flight:
+                done_line, future = in_flight.popleft()
+                collect(done_line, future.result() if future else [])
+
+    if buffer or buffer_line != checkpointed_line:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "written": written,
+        "last_line": buffer_line,
+        "seconds": round(elapsed, 3),
+        "issues_per_second": round(written / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Bulk-triage issues from a JSONL (optionally gzip) dump.")
+    parser.add_argument("path", help="JSONL file of GitHub API issue objects (.gz supported)")
+    parser.add_argument("--repo", help="Repository (owner/repo) to assign; defaults to each issue's repository_url")
+    parser.add_argument("--workers", type=int, default=None, help="Classifier processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Issues per classification task")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Issues per database upsert/checkpoint")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore any existing checkpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    summary = backfill(
+        args.path,
+        create_storage(),
+        repository=args.repo,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint,
+        resume=not args.restart,
+    )
+    print(f"Backfill complete: {summary['written']} issues in {summary['seconds']}s "
+          f"({summary['issues_per_second']} issues/s).")
+
+
+if __name__ == "__main__":
+    main()
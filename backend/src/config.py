@@ -9,5 +9,19 @@ class Config:
     MODEL_PATH = os.getenv("MODEL_PATH", "model_artifacts/model.pkl")
     VECTORIZER_PATH = os.getenv("VECTORIZER_PATH", "model_artifacts/vectorizer.pkl")
     STORAGE_FILE = os.getenv("STORAGE_FILE", "storage.json")
+    STORAGE_MODE = os.getenv("STORAGE_MODE", "single") # single, partitioned (one SQLite file per repository)
+    STORAGE_PARTITION_DIR = os.getenv("STORAGE_PARTITION_DIR", "partitions")
+    STORAGE_FANOUT_WORKERS = int(os.getenv("STORAGE_FANOUT_WORKERS", "8"))
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     API_KEY = os.getenv("API_KEY", "dev-secret-key") # Default for dev convenience
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2")) # In-process workers; 0 = run `python -m src.jobs` separately
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    WEBHOOK_LOG_FILE = os.getenv("WEBHOOK_LOG_FILE", "webhook_log.db") # Separate SQLite file (WAL) so acks never wait on issue writes
+    WEBHOOK_LOG_BUSY_TIMEOUT = float(os.getenv("WEBHOOK_LOG_BUSY_TIMEOUT", "2"))
+    WEBHOOK_SWEEP_INTERVAL = float(os.getenv("WEBHOOK_SWEEP_INTERVAL", "5"))
+    WEBHOOK_LOG_RETENTION_DAYS = float(os.getenv("WEBHOOK_LOG_RETENTION_DAYS", "7")) # Redeliveries are deduplicated within this window
+    EVENT_FEED_RETENTION = int(os.getenv("EVENT_FEED_RETENTION", "10000")) # Events kept for /events clients to resume from
+    EVENT_FEED_POLL_INTERVAL = float(os.getenv("EVENT_FEED_POLL_INTERVAL", "1.0"))
+    EVENT_FEED_KEEPALIVE = float(os.getenv("EVENT_FEED_KEEPALIVE", "15"))
@@ -0,0 +1,245 @@
+import heapq
+import itertools
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from src.config import Config
+from src.models import FeedEvent
+
+# Fields sent to dashboards; the body is left out to keep deltas small
+COMPACT_FIELDS = ("id", "number", "title", "state", "status", "predicted_label",
+                  "priority_score", "repository", "html_url")
+
+# Large triage runs are split into several scores.updated events
+SCORES_PER_EVENT = 500
+
+
+def compact_issue(issue: Dict) -> Dict:
+    return {field: issue.get(field) for field in COMPACT_FIELDS}
+
+
+def stats_delta(changes: List[Tuple[Optional[tuple], tuple]]) -> Optional[Dict]:
+    """
+    Turns (before, after) pairs of (status, predicted_label) into counter deltas
+    matching the shape of /stats. `before` is None for newly created issues.
+    Returns None if no counter changed.
+    """
+    total = 0
+    status_counts = {}
+    label_counts = {}
+
+    def bump(counts, key, amount):
+        counts[key] = counts.get(key, 0) + amount
+        if counts[key] == 0:
+            del counts[key]
+
+    for before, after in changes:
+        if before == after:
+            continue
+        if before is None:
+            total += 1
+        else:
+            bump(status_counts, before[0] or "unknown", -1)
+            bump(label_counts, before[1] or "unlabeled", -1)
+        bump(status_counts, after[0] or "unknown", 1)
+        bump(label_counts, after[1] or "unlabeled", 1)
+
+    if not (total or status_counts or label_counts):
+        return None
+    return {"total": total, "status_counts": status_counts, "label_counts": label_counts}
+
+
+def format_sse(event_type: str, data: str, event_id: int = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+class EventFeed:
+    """
+    Ordered log of issue deltas in the `feed_events` table.
+
+    The table lives in the same database as the issues it describes, and
+    Storage appends to it in the same transaction as each write, so a
+    committed write always has its delta. /events streams it to dashboards,
+    picking up writes from any process. Each event's ID is the client's
+    resume token. Only the newest EVENT_FEED_RETENTION events are kept;
+    clients that fall further behind are told to refetch.
+    """
+
+    def __init__(self, engine, retention: int = None):
+        self.engine = engine
+        self.retention = retention or Config.EVENT_FEED_RETENTION
+        self._latest_cache: Tuple[Optional[tuple], int] = (None, 0)
+        FeedEvent.__table__.create(bind=engine, checkfirst=True)
+
+    def publish(self, events: List[Tuple[str, Dict]], conn=None):
+        """Appends events, inside the caller's transaction if `conn` is given."""
+        if not events:
+            return
+        if conn is None:
+            with self.engine.begin() as conn:
+                self._insert(conn, events)
+        else:
+            self._insert(conn, events)
+
+    def _insert(self, conn, events: List[Tuple[str, Dict]]):
+        now = time.time()
+        rows = [{"type": event_type, "data": json.dumps(data), "created_at": now} for event_type, data in events]
+        conn.execute(
+            text("INSERT INTO feed_events (type, data, created_at) VALUES (:type, :data, :created_at)"),
+            rows,
+        )
+        conn.execute(
+            text("DELETE FROM feed_events WHERE id <= (SELECT MAX(id) FROM feed_events) - :retention"),
+            {"retention": self.retention},
+        )
+
+    def bounds(self) -> Tuple[int, int]:
+        """Returns (oldest, latest) retained event IDs, or (0, 0) if the feed is empty."""
+        with self.engine.connect() as conn:
+            oldest, latest = conn.execute(text("SELECT MIN(id), MAX(id) FROM feed_events")).first()
+        return oldest or 0, latest or 0
+
+    def latest(self) -> int:
+        """Latest event ID, re-queried only when the database has changed since the last call."""
+        stamp, latest = self._latest_cache
+        current = self._stamp()
+        if current is None or current != stamp:
+            latest = self.bounds()[1]
+            self._latest_cache = (current, latest)
+        return latest
+
+    def _stamp(self) -> Optional[tuple]:
+        """
+        SQLite's file change counter (header bytes 24-27), which every commit
+        bumps in rollback-journal mode, plus the WAL file's size for WAL mode.
+        """
+        path = self.engine.url.database
+        if not path or path == ":memory:":
+            return None
+        try:
+            with open(path, "rb") as f:
+                f.seek(24)
+                counter = f.read(4)
+        except OSError:
+            return None
+        try:
+            wal = os.stat(path + "-wal")
+            wal_stamp = (wal.st_size, wal.st_mtime_ns)
+        except OSError:
+            wal_stamp = None
+        return counter, wal_stamp
+
+    def resolve(self, since=None, last_event_id: str = None):
+        """Picks the client's resume token; EventSource's Last-Event-ID is newer than ?since=."""
+        return last_event_id or since
+
+    def resumable(self, token) -> bool:
+        """Whether every event after `token` is still retained."""
+        if not str(token).isdigit():
+            return False
+        oldest, latest = self.bounds()
+        return int(token) <= latest and not (oldest and int(token) < oldest - 1)
+
+    def read(self, after, limit: int = 500, base=None) -> List[Dict]:
+        """
+        Returns events newer than token `after` in order. `data` is the raw JSON string.
+        `base` only matters for FeedSet, whose IDs can be relative.
+        """
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT id, type, data, created_at FROM feed_events WHERE id > :after ORDER BY id LIMIT :limit"),
+                {"after": int(after), "limit": limit},
+            ).fetchall()
+        return [{"id": row.id, "type": row.type, "data": row.data, "created_at": row.created_at} for row in rows]
+
+
+class FeedSet:
+    """
+    Reads the per-partition feeds of a PartitionedStorage as one feed.
+
+    A token is "name:id,name:id" with one position per partition file.
+    Partitions missing from a token, e.g. created after it was issued, are
+    read from the start. Deltas from different partitions commute, so events
+    are interleaved by commit time only to keep the stream readable.
+
+    Event IDs in a stream are relative tokens ("+name:id,...") holding only
+    the positions that moved since the stream's base token (its ?since=), so
+    they don't grow with the number of partitions. On reconnect, EventSource
+    sends the relative ID as Last-Event-ID with the same ?since=, and
+    `resolve` combines them.
+    """
+
+    def __init__(self, feeds: Callable[[], Dict[str, EventFeed]]):
+        self.feeds = feeds
+
+    @staticmethod
+    def parse(token) -> Optional[Dict[str, int]]:
+        if str(token).startswith("+"):
+            return None # Relative; only meaningful with its base, see resolve()
+        positions = {}
+        for part in str(token).split(","):
+            if not part:
+                continue
+            name, sep, position = part.rpartition(":")
+            if not sep or not position.isdigit():
+                return None
+            positions[name] = int(position)
+        return positions
+
+    @staticmethod
+    def format(positions: Dict[str, int]) -> str:
+        return ",".join(f"{name}:{position}" for name, position in sorted(positions.items()))
+
+    def latest(self) -> str:
+        return self.format({name: feed.latest() for name, feed in self.feeds().items()})
+
+    def resolve(self, since=None, last_event_id: str = None):
+        if not (last_event_id and last_event_id.startswith("+")):
+            return last_event_id or since
+        base = self.parse(since) if since is not None else None
+        if base is None:
+            # Unusable without its base; resumable() rejects it and the client is reset
+            return last_event_id
+        base.update(self.parse(last_event_id[1:]) or {})
+        return self.format(base)
+
+    def resumable(self, token) -> bool:
+        positions = self.parse(token)
+        if positions is None:
+            return False
+        return all(feed.resumable(positions.get(name, 0)) for name, feed in self.feeds().items())
+
+    def read(self, after, limit: int = 500, base=None) -> List[Dict]:
+        """
+        Returns events newer than token `after`. Each ID is the token after that
+        event, relative to `base` if given.
+        """
+        positions = self.parse(after) or {}
+        base_positions = self.parse(base) if base is not None else None
+        # latest() is cached per feed, so idle partitions cost no query
+        streams = [
+            [(event["created_at"], name, event["id"], event) for event in feed.read(positions.get(name, 0), limit)]
+            for name, feed in self.feeds().items()
+            if feed.latest() > positions.get(name, 0)
+        ]
+        events = []
+        for _, name, event_id, event in itertools.islice(heapq.merge(*streams), limit):
+            positions[name] = event_id
+            if base_positions is None:
+                token = self.format(positions)
+            else:
+                token = "+" + self.format({
+                    name: position for name, position in positions.items()
+                    if base_positions.get(name, 0) != position
+                })
+            events.append(dict(event, id=token))
+        return events
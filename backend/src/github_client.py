@@ -5,6 +5,25 @@ from src.config import Config
 
 GITHUB_API_URL = "https://api.github.com"
 
+def parse_issue(item: Dict) -> Optional[Dict]:
+    """
+    Maps a GitHub API issue object to our internal format.
+    Returns None for pull requests, which the issues endpoint also returns.
+    """
+    if "pull_request" in item:
+        return None
+
+    return {
+        "id": item.get("id"),
+        "number": item.get("number"),
+        "title": item.get("title"),
+        "body": item.get("body") or "",
+        "state": item.get("state"),
+        "created_at": item.get("created_at"),
+        "labels": [label["name"] if isinstance(label, dict) else label for label in item.get("labels", [])],
+        "html_url": item.get("html_url")
+    }
+
 def fetch_issues(repo_name: str, token: Optional[str] = None) -> List[Dict]:
     """
     Fetches open issues from a GitHub repository processing pagination.
@@ -43,21 +62,9 @@ def fetch_issues(repo_name: str, token: Optional[str] = None) -> List[Dict]:
                 break
             
             for item in data:
-                # Basic filtering: skip pull requests as they are also returned in issues endpoint
-                if "pull_request" in item:
-                    continue
-                
-                filtered_issue = {
-                    "id": item.get("id"),
-                    "number": item.get("number"),
-                    "title": item.get("title"),
-                    "body": item.get("body") or "",
-                    "state": item.get("state"),
-                    "created_at": item.get("created_at"),
-                    "labels": [label["name"] for label in item.get("labels", [])],
-                    "html_url": item.get("html_url")
-                }
-                issues.append(filtered_issue)
+                filtered_issue = parse_issue(item)
+                if filtered_issue is not None:
+                    issues.append(filtered_issue)
             
             # Check Link header for pagination, but simplest logic is just data empty check or < per_page
             if len(data) < per_page:
@@ -0,0 +1,332 @@
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from src.config import Config
+from src.models import Job
+
+logger = logging.getLogger("IssuePilot.jobs")
+
+# A handler receives the job's repository (may be None) and a progress callback
+# progress(done, total, message=None), and returns an optional summary message.
+Handler = Callable[[Optional[str], Callable[..., None]], Optional[str]]
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue.
+
+    Jobs are rows in the `jobs` table, so they survive restarts and can be
+    picked up by any process sharing the database (the API process or a
+    standalone `python -m src.jobs` worker).
+    """
+
+    def __init__(self, engine, workers: int = None, poll_interval: float = None,
+                 lease_seconds: float = None, max_attempts: int = None):
+        self.engine = engine
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.workers = Config.JOB_WORKERS if workers is None else workers
+        self.poll_interval = poll_interval or Config.JOB_POLL_INTERVAL
+        self.lease_seconds = lease_seconds or Config.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or Config.JOB_MAX_ATTEMPTS
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.handlers: Dict[str, Handler] = {}
+        self.issue_writers = set()
+        self._running_ids = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        Job.__table__.create(bind=engine, checkfirst=True)
+
+    def register(self, kind: str, handler: Handler, writes_issues: bool = False):
+        """
+        Registers the handler for a job kind. Jobs that write issues are
+        serialized against each other per repository (see claim_next).
+        """
+        self.handlers[kind] = handler
+        if writes_issues:
+            self.issue_writers.add(kind)
+
+    # --- Producer side -------------------------------------------------
+
+    def enqueue(self, kind: str, repository: str = None) -> Dict:
+        """
+        Queues a job, or returns the already-pending job for the same kind and
+        repository. The returned dict carries `deduplicated: True` in that case.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        dedupe_key = repository or ""
+        session = self.SessionLocal()
+        try:
+            job = Job(kind=kind, repository=repository, dedupe_key=dedupe_key,
+                      status="queued", progress=0, total=0, attempts=0, created_at=time.time())
+            session.add(job)
+            try:
+                session.commit()
+                deduplicated = False
+            except IntegrityError:
+                # The partial unique index rejected a second pending job
+                session.rollback()
+                job = session.query(Job).filter(
+                    Job.kind == kind, Job.dedupe_key == dedupe_key, Job.status == "queued"
+                ).first()
+                if job is None:
+                    # Claimed between our insert and lookup; queue a fresh one
+                    return self.enqueue(kind, repository)
+                deduplicated = True
+            result = job.to_dict()
+        finally:
+            session.close()
+
+        result["deduplicated"] = deduplicated
+        self._wakeup.set()
+        return result
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        session = self.SessionLocal()
+        try:
+            job = session.get(Job, job_id)
+            return job.to_dict() if job else None
+        finally:
+            session.close()
+
+    # --- Worker side ---------------------------------------------------
+
+    def claim_next(self) -> Optional[Dict]:
+        """
+        Atomically moves the oldest runnable job to `running`. A job is not
+        runnable while a conflicting job is running: one of the same kind and
+        key (so two syncs of a repository never overlap), or, for jobs that
+        write issues, any other issue writer for the same repository. Writers
+        without a repository (triage, webhook) conflict with every writer.
+        """
+        now = time.time()
+        kinds = list(self.handlers)
+        if not kinds:
+            return None
+        params = {f"k{i}": k for i, k in enumerate(kinds)}
+        kind_list = ", ".join(f":k{i}" for i in range(len(kinds)))
+        writers = sorted(self.issue_writers) or [""]
+        writer_params = {f"w{i}": k for i, k in enumerate(writers)}
+        writer_list = ", ".join(f":w{i}" for i in range(len(writers)))
+
+        with self.engine.begin() as conn:
+            candidates = conn.execute(text(f"""
+                SELECT id, kind, dedupe_key FROM jobs
+                WHERE status = 'queued' AND kind IN ({kind_list})
+                ORDER BY id LIMIT 20
+            """), params).fetchall()
+
+            for job_id, kind, dedupe_key in candidates:
+                # The conflict check lives in the UPDATE so it is atomic across processes
+                claimed = conn.execute(text(f"""
+                    UPDATE jobs
+                    SET status = 'running', started_at = :now, heartbeat_at = :now,
+                        finished_at = NULL, error = NULL, worker = :worker,
+                        attempts = attempts + 1
+                    WHERE id = :id AND status = 'queued'
+                      AND NOT EXISTS (
+                          SELECT 1 FROM jobs AS r
+                          WHERE r.status = 'running' AND (
+                              (r.kind = :kind AND r.dedupe_key = :key)
+                              OR (:writes AND r.kind IN ({writer_list})
+                                  AND (r.dedupe_key = :key OR r.dedupe_key = '' OR :key = ''))
+                          )
+                      )
+                """), {"now": now, "worker": self.worker_id, "id": job_id, "kind": kind,
+                       "key": dedupe_key, "writes": kind in self.issue_writers, **writer_params})
+                if claimed.rowcount == 1:
+                    row = conn.execute(text("SELECT kind, repository FROM jobs WHERE id = :id"),
+                                       {"id": job_id}).first()
+                    return {"id": job_id, "kind": row.kind, "repository": row.repository}
+        return None
+
+    def run_job(self, job: Dict):
+        job_id = job["id"]
+        with self._lock:
+            self._running_ids.add(job_id)
+
+        def progress(done: int, total: int, message: str = None):
+            self._update(job_id, progress=done, total=total, message=message, heartbeat_at=time.time())
+
+        logger.info(f"Job {job_id} ({job['kind']}) started for {job['repository'] or 'all repositories'}.")
+        try:
+            try:
+                message = self.handlers[job["kind"]](job["repository"], progress)
+            except Exception as e:
+                logger.error(f"Job {job_id} ({job['kind']}) failed: {e}", exc_info=True)
+                self._finish(job_id, status="failed", error=str(e), finished_at=time.time())
+            else:
+                self._finish(job_id, status="succeeded", message=message, finished_at=time.time())
+                logger.info(f"Job {job_id} ({job['kind']}) succeeded.")
+        finally:
+            with self._lock:
+                self._running_ids.discard(job_id)
+
+    def _finish(self, job_id: int, attempts: int = 5, **fields):
+        """
+        Records a job's final status, retrying so a briefly locked database
+        doesn't leave a finished job `running` (recover_stale would rerun it).
+        """
+        for attempt in range(1, attempts + 1):
+            try:
+                self._update(job_id, **fields)
+                return
+            except Exception as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"Recording status of job {job_id} failed (attempt {attempt}): {e}")
+                time.sleep(min(0.2 * 2 ** attempt, 5.0))
+
+    def run_pending(self) -> int:
+        """Runs queued jobs in the calling thread until none are left. Returns the count."""
+        count = 0
+        while True:
+            job = self.claim_next()
+            if job is None:
+                return count
+            self.run_job(job)
+            count += 1
+
+    def recover_stale(self):
+        """
+        Requeues running jobs whose worker stopped heartbeating (e.g. the
+        process died). Jobs that exhausted their attempts, or that already have
+        a pending duplicate, are marked failed instead.
+        """
+        cutoff = time.time() - self.lease_seconds
+        session = self.SessionLocal()
+        try:
+            stale = session.query(Job).filter(Job.status == "running", Job.heartbeat_at < cutoff).all()
+            for job in stale:
+                pending = session.query(Job).filter(
+                    Job.kind == job.kind, Job.dedupe_key == job.dedupe_key, Job.status == "queued"
+                ).first()
+                if pending is not None:
+                    job.status = "failed"
+                    job.error = f"Worker lost; superseded by job {pending.id}"
+                    job.finished_at = time.time()
+                elif job.attempts >= self.max_attempts:
+                    job.status = "failed"
+                    job.error = f"Worker lost after {job.attempts} attempts"
+                    job.finished_at = time.time()
+                else:
+                    job.status = "queued"
+                    job.worker = None
+                logger.warning(f"Recovered stale job {job.id} ({job.kind}) -> {job.status}.")
+            session.commit()
+            if stale:
+                self._wakeup.set()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Stale job recovery failed: {e}", exc_info=True)
+        finally:
+            session.close()
+
+    def _heartbeat(self):
+        with self._lock:
+            ids = list(self._running_ids)
+        if not ids:
+            return
+        session = self.SessionLocal()
+        try:
+            session.query(Job).filter(Job.id.in_(ids)).update(
+                {Job.heartbeat_at: time.time()}, synchronize_session=False
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    def _update(self, job_id: int, **fields):
+        fields = {k: v for k, v in fields.items() if v is not None}
+        session = self.SessionLocal()
+        try:
+            session.query(Job).filter(Job.id == job_id).update(fields, synchronize_session=False)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    # --- Pool lifecycle ------------------------------------------------
+
+    def start(self):
+        """Starts the worker threads and the heartbeat/recovery thread."""
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._maintenance_loop, name="job-maintenance", daemon=True)
+        t.start()
+        self._threads.append(t)
+        logger.info(f"Job queue started with {self.workers} worker(s).")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def run_forever(self):
+        self.start()
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self.claim_next()
+            except Exception as e:
+                logger.error(f"Failed to claim job: {e}", exc_info=True)
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            try:
+                self.run_job(job)
+            except Exception as e:
+                # Keep the worker alive; the job's lease expires and recover_stale handles it
+                logger.error(f"Job {job['id']} could not be completed: {e}", exc_info=True)
+
+    def _maintenance_loop(self):
+        interval = max(self.lease_seconds / 4, self.poll_interval)
+        self.recover_stale()
+        while not self._stop.wait(interval):
+            try:
+                self._heartbeat()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {e}", exc_info=True)
+            self.recover_stale()
+
+
+if __name__ == "__main__":
+    # Standalone worker: `python -m src.jobs`
+    from src.main import get_job_queue
+
+    job_queue = get_job_queue()
+    if job_queue.workers <= 0:
+        job_queue.workers = 1
+    job_queue.run_forever()
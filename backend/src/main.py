@@ -1,12 +1,21 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import StreamingResponse, FileResponse
-from typing import List, Dict
-from src.github_client import fetch_issues
+from contextlib import asynccontextmanager
+from typing import List, Dict, Union
 from src.ml_model import IssueClassifier
 from src.priority_scorer import PriorityScorer
-from src.storage import Storage
+from src.storage import Storage, PartitionedStorage, create_storage
+from src.jobs import JobQueue
+from src.webhook_log import WebhookLog
+from src.events import EventFeed, FeedSet, format_sse
 from src.config import Config
+import asyncio
+import json
 import logging
+import threading
+
+from sqlalchemy.exc import OperationalError
+from starlette.concurrency import run_in_threadpool
 
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -20,25 +29,87 @@ logging.basicConfig(
 )
 logger = logging.getLogger("IssuePilot")
 
-limiter = Limiter(key_func=get_remote_address)
-app = FastAPI(title="IssuePilot", description="Automated GitHub Issue Triage System", version="1.0.0")
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Components are built on first use rather than at import time, so importing
+# the app doesn't touch the database or load scikit-learn.
+_components = {}
+_components_lock = threading.RLock()
+
+def _component(name, factory):
+    component = _components.get(name)
+    if component is None:
+        with _components_lock:
+            component = _components.get(name)
+            if component is None:
+                component = _components[name] = factory()
+    return component
+
+def get_storage() -> Union[Storage, PartitionedStorage]:
+    return _component("storage", create_storage)
+
+def get_classifier() -> IssueClassifier:
+    return _component("classifier", IssueClassifier)
+
+def get_job_queue() -> JobQueue:
+    def build():
+        queue = JobQueue(get_storage().engine)
+        queue.register("sync", run_sync_process, writes_issues=True)
+        queue.register("triage", run_triage_process, writes_issues=True)
+        queue.register("webhook", run_webhook_process, writes_issues=True)
+        return queue
+    return _component("job_queue", build)
+
+def get_webhook_log() -> WebhookLog:
+    return _component("webhook_log", WebhookLog)
+
+def get_event_feed() -> Union[EventFeed, FeedSet]:
+    return get_storage().feed
 
-# Initialize components
-storage = Storage()
-classifier = IssueClassifier()
 scorer = PriorityScorer()
 
-@app.on_event("startup")
-async def startup_event():
-    # Load model on startup
+def warm_up_model():
     try:
-        classifier.load_model()
+        get_classifier().load_model()
         logger.info("ML Model loaded successfully.")
     except Exception as e:
         logger.warning(f"Failed to load ML model: {e}. Please ensure it is trained.")
 
+async def sweep_webhook_log(appended: asyncio.Event):
+    """
+    Queues the webhook job for pending log events. Runs when /webhook signals
+    `appended`, and every WEBHOOK_SWEEP_INTERVAL seconds as a fallback, so the
+    acknowledgement itself never touches the issue database.
+    """
+    while True:
+        try:
+            await asyncio.wait_for(appended.wait(), Config.WEBHOOK_SWEEP_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        appended.clear()
+        try:
+            if await run_in_threadpool(lambda: get_webhook_log().pending_count()):
+                await run_in_threadpool(lambda: get_job_queue().enqueue("webhook"))
+        except Exception as e:
+            logger.warning(f"Webhook log sweep failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_queue = get_job_queue()
+    get_webhook_log()
+    job_queue.start()
+    if job_queue.workers > 0:
+        # Load the model off the startup path so / and /webhook are served while scikit-learn loads
+        threading.Thread(target=warm_up_model, name="model-warmup", daemon=True).start()
+    app.state.webhook_appended = asyncio.Event()
+    sweeper = asyncio.create_task(sweep_webhook_log(app.state.webhook_appended))
+    yield
+    sweeper.cancel()
+    job_queue.stop()
+
+limiter = Limiter(key_func=get_remote_address)
+app = FastAPI(title="IssuePilot", description="Automated GitHub Issue Triage System", version="1.0.0", lifespan=lifespan)
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
 from fastapi import Depends, status
 from fastapi.security import APIKeyHeader
 
@@ -54,28 +125,39 @@ def get_api_key(api_key: str = Depends(api_key_header)):
 
 @app.post("/sync", summary="Fetch and sync issues from GitHub", dependencies=[Depends(get_api_key)])
 @limiter.limit("5/minute")
-def sync_issues(request: Request, background_tasks: BackgroundTasks, repo_name: str = None):
+def sync_issues(request: Request, repo_name: str = None):
     """
-    Triggers a background task to fetch issues from the configured GitHub repository.
+    Queues a job to fetch issues from the configured GitHub repository.
     Can optionally specify a repo_name to override the default.
+    A sync already pending for the same repository is reused instead of queuing another.
     """
     target_repo = repo_name or Config.REPO_NAME
     if not target_repo:
         raise HTTPException(status_code=400, detail="Repository not specified and default not configured.")
     
-    background_tasks.add_task(run_sync_process, target_repo)
-    return {"message": f"Issue synchronization started for {target_repo}."}
+    job = get_job_queue().enqueue("sync", target_repo)
+    if job["deduplicated"]:
+        message = f"Issue synchronization already queued for {target_repo}."
+    else:
+        message = f"Issue synchronization queued for {target_repo}."
+    return {"message": message, "job_id": job["id"], "job": job}
+
 
+def run_sync_process(repo_name: str, progress=None):
+    from src.github_client import fetch_issues
 
-def run_sync_process(repo_name: str):
     logger.info(f"Starting sync for {repo_name}...")
+    progress = progress or (lambda *args, **kwargs: None)
     try:
         issues = fetch_issues(repo_name)
-        existing_data = storage.load_data()
+        progress(0, len(issues), f"Fetched {len(issues)} issues")
+        existing_data = get_storage().load_data()
         
         # Simple merge logic: convert existing to dict by ID for fast lookup
         existing_map = {item["id"]: item for item in existing_data}
         
+        # Only write back what this sync changes, so concurrent jobs' updates to other issues aren't clobbered
+        updates = []
         new_count = 0
         for issue in issues:
             if issue["id"] not in existing_map:
@@ -84,25 +166,42 @@ def run_sync_process(repo_name: str):
                 issue["predicted_label"] = None
                 issue["priority_score"] = 0
                 issue["repository"] = repo_name
-                existing_map[issue["id"]] = issue
+                updates.append(issue)
                 new_count += 1
             else:
                 # Update repository if missing
-                 if "repository" not in existing_map[issue["id"]]:
-                     existing_map[issue["id"]]["repository"] = repo_name
+                 if not existing_map[issue["id"]].get("repository"):
+                     updates.append({"id": issue["id"], "repository": repo_name})
         
-        storage.bulk_save(list(existing_map.values()))
+        get_storage().bulk_save(updates)
+        progress(len(issues), len(issues))
         logger.info(f"Sync complete for {repo_name}. {new_count} new issues added.")
+        return f"{new_count} new issues added."
     except Exception as e:
         logger.error(f"Sync failed for {repo_name}: {e}", exc_info=True)
+        raise
 
 @app.post("/triage", summary="Run triage on stored issues", dependencies=[Depends(get_api_key)])
 @limiter.limit("5/minute")
 def run_triage(request: Request):
     """
-    Runs classification and priority scoring on all 'new' issues.
+    Queues classification and priority scoring of all stored issues.
+    Returns the already-pending triage job if there is one.
+    """
+    job = get_job_queue().enqueue("triage")
+    if job["deduplicated"]:
+        message = "Triage already queued."
+    else:
+        message = "Triage queued."
+    return {"message": message, "job_id": job["id"], "job": job}
+
+
+def run_triage_process(repo_name: str = None, progress=None):
+    """
+    Runs classification and priority scoring on all stored issues.
     """
-    data = storage.load_data()
+    progress = progress or (lambda *args, **kwargs: None)
+    data = get_storage().load_data()
     processed_count = 0
     
     # Identify issues needing triage
@@ -112,18 +211,34 @@ def run_triage(request: Request):
     texts = [item.get("title", "") + " " + item.get("body", "") for item in to_triage]
     
     try:
-        predictions = classifier.predict(texts)
+        predictions = get_classifier().predict(texts)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Triage failed (Model Error): {e}")
+        raise RuntimeError(f"Triage failed (Model Error): {e}") from e
 
     for i, item in enumerate(to_triage):
         item["predicted_label"] = predictions[i]
         item["priority_score"] = scorer.calculate_score(item)
         item["status"] = "triaged"
         processed_count += 1
+        if processed_count % 500 == 0:
+            progress(processed_count, len(to_triage))
     
-    storage.bulk_save(data)
-    return {"message": "Triage complete.", "processed_count": processed_count}
+    # Write back only the triage fields so edits applied while we were classifying survive
+    triage_fields = ("id", "repository", "predicted_label", "priority_score", "status")
+    get_storage().bulk_save([{k: item.get(k) for k in triage_fields} for item in to_triage])
+    progress(processed_count, len(to_triage))
+    return f"Triage complete. {processed_count} issues processed."
+
+
+@app.get("/jobs/{job_id}", summary="Get background job status", dependencies=[Depends(get_api_key)])
+def get_job(job_id: int):
+    """
+    Returns the status, progress and timings of a queued sync or triage job.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @app.get("/issues", summary="List triaged issues", dependencies=[Depends(get_api_key)])
 def list_issues(status: str = None, min_score: int = 0, limit: int = 20, offset: int = 0, repository: str = None):
@@ -131,95 +246,76 @@ def list_issues(status: str = None, min_score: int = 0, limit: int = 20, offset:
     Returns a list of issues, optionally filtered by status, minimum priority score, and repository.
     Supports pagination via limits and offsets.
     """
-    data = storage.load_data()
-    filtered_results = []
-    
-    for item in data:
-        if status and item.get("status") != status:
-            continue
-        if item.get("priority_score", 0) < min_score:
-            continue
-        if repository and item.get("repository") != repository:
-            continue
-        filtered_results.append(item)
-        
-    # Sort by priority score descending
-    filtered_results.sort(key=lambda x: x.get("priority_score", 0), reverse=True)
-    
-    # Apply pagination
-    paginated_results = filtered_results[offset : offset + limit]
+    total, items = get_storage().query_issues(
+        status=status, min_score=min_score, repository=repository, limit=limit, offset=offset
+    )
     
     return {
-        "total": len(filtered_results),
+        "total": total,
         "limit": limit,
         "offset": offset,
-        "items": paginated_results
+        "items": items
     }
 
 from src.webhook import verify_signature
 
 @app.post("/webhook", summary="GitHub Webhook Endpoint")
-async def github_webhook(request: Request, background_tasks: BackgroundTasks):
+async def github_webhook(request: Request):
     """
-    Handles incoming GitHub webhooks. Triggers triage on new issues.
+    Handles incoming GitHub webhooks.
+    The verified event is appended to the webhook log and acknowledged immediately;
+    a queued job applies it (and triggers triage) afterwards.
     """
     # Verify signature
     # In a real app, this would be a dependency or middleware
     await verify_signature(request)
     
-    payload = await request.json()
-    action = payload.get("action")
-    issue = payload.get("issue")
+    body = await request.body()
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    event = request.headers.get("X-GitHub-Event")
+    try:
+        # SQLite calls block, so keep them off the event loop
+        appended = await run_in_threadpool(lambda: get_webhook_log().append(body, delivery_id, event))
+    except OperationalError as e:
+        logger.warning(f"Webhook log busy, delivery {delivery_id} not stored: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Webhook log busy, please retry",
+            headers={"Retry-After": "5"},
+        )
+    if not appended:
+        return {"message": "Duplicate delivery ignored"}
     
-    if action in ["opened", "reopened", "edited"] and issue:
-        # Process the issue immediately
-        # We need to adapt the issue payload to our internal format
-        internal_issue = {
-            "id": issue.get("id"),
-            "number": issue.get("number"),
-            "title": issue.get("title"),
-            "body": issue.get("body") or "",
-            "state": issue.get("state"),
-            "created_at": issue.get("created_at"),
-            "html_url": issue.get("html_url"),
-            "status": "new",
-            "predicted_label": None,
-            "priority_score": 0
-        }
-        
-        # Save to DB
-        storage.save_issue_result(internal_issue["id"], internal_issue)
-        
-        # Trigger triage for this specific issue
-        # Note: run_triage currently re-scans everything. We could optimize to triage just one.
-        # For Phase 2, let's trigger the full triage or a specific one.
-        # Let's just trigger the full triage for simplicity and correctness.
-        background_tasks.add_task(run_triage)
-        
+    # sweep_webhook_log queues the job; a burst of deliveries coalesces into one pending job
+    webhook_appended = getattr(request.app.state, "webhook_appended", None)
+    if webhook_appended is not None:
+        webhook_appended.set()
     return {"message": "Webhook received"}
 
+
+def run_webhook_process(repo_name: str = None, progress=None):
+    """
+    Applies pending webhook events, keeping only the newest event per issue, then queues triage.
+    """
+    def apply(issues):
+        for issue in issues:
+            get_storage().save_issue_result(issue["id"], issue)
+
+    applied = get_webhook_log().drain(apply, progress=progress)
+    get_webhook_log().prune(Config.WEBHOOK_LOG_RETENTION_DAYS * 86400)
+    if applied:
+        # Note: triage currently re-scans everything. We could optimize to triage just one.
+        get_job_queue().enqueue("triage")
+    return f"{applied} issues updated from webhooks."
+
+
 @app.get("/stats", summary="Get issue statistics", dependencies=[Depends(get_api_key)])
-def get_stats():
+def get_stats(repository: str = None):
     """
-    Returns aggregated statistics for issues (by status and label).
+    Returns aggregated statistics for issues (by status and label), optionally for one repository.
+    `token` is the /events position these counts are current as of.
     """
-    data = storage.load_data()
-    total = len(data)
-    status_counts = {}
-    label_counts = {}
-    
-    for item in data:
-        s = item.get("status", "unknown")
-        status_counts[s] = status_counts.get(s, 0) + 1
-        
-        l = item.get("predicted_label") or "unlabeled"
-        label_counts[l] = label_counts.get(l, 0) + 1
-        
-    return {
-        "total": total,
-        "status_counts": status_counts,
-        "label_counts": label_counts
-    }
+    return get_storage().stats(repository)
 
 import io
 import csv
@@ -230,7 +326,7 @@ def export_issues():
     """
     Generates a CSV file containing all stored issues.
     """
-    data = storage.load_data()
+    data = get_storage().load_data()
     
     # Define CSV headers
     fieldnames = ["id", "number", "title", "state", "status", "predicted_label", "priority_score", "created_at", "html_url"]
@@ -256,15 +352,73 @@ def update_label(issue_id: int, update: LabelUpdate):
     """
     Manually correct the predicted label for an issue.
     """
-    data = storage.load_data()
-    for item in data:
-        if item["id"] == issue_id:
-            item["predicted_label"] = update.label
-            item["manual_correction"] = True # Flag for future retraining
-            storage.save_issue_result(issue_id, item)
-            return {"message": "Label updated", "issue": item}
-            
-    raise HTTPException(status_code=404, detail="Issue not found")
+    item = get_storage().get_issue(issue_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    
+    item["predicted_label"] = update.label
+    item["manual_correction"] = True # Flag for future retraining
+    get_storage().save_issue_result(issue_id, item)
+    return {"message": "Label updated", "issue": item}
+
+from fastapi.security import APIKeyQuery
+
+optional_api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+api_key_query = APIKeyQuery(name="api_key", auto_error=False)
+
+def get_stream_api_key(header_key: str = Depends(optional_api_key_header), query_key: str = Depends(api_key_query)):
+    # EventSource can't send custom headers, so the stream also accepts ?api_key=
+    return get_api_key(header_key or query_key)
+
+async def event_stream(request: Request, feed: Union[EventFeed, FeedSet], token=None, base=None):
+    """
+    Yields Server-Sent Events for feed entries after `token`, polling the feed
+    so that writes from worker processes are picked up too. Event IDs are
+    relative to `base`, the client's ?since=, where the feed supports it.
+    """
+    latest = await run_in_threadpool(feed.latest)
+    yield "retry: 3000\n\n"
+    if token is None:
+        token = latest
+        yield format_sse("ready", json.dumps({"token": latest}), latest)
+    elif not await run_in_threadpool(feed.resumable, token):
+        # Events the client missed were pruned (or the token is unknown); it has to refetch
+        token = latest
+        yield format_sse("reset", json.dumps({"token": latest}), latest)
+
+    idle = 0.0
+    while not await request.is_disconnected():
+        events = await run_in_threadpool(lambda: feed.read(token, base=base))
+        for event in events:
+            yield format_sse(event["type"], event["data"], event["id"])
+            token = feed.resolve(base, event["id"])
+        if events:
+            idle = 0.0
+            continue
+
+        await asyncio.sleep(Config.EVENT_FEED_POLL_INTERVAL)
+        idle += Config.EVENT_FEED_POLL_INTERVAL
+        if idle >= Config.EVENT_FEED_KEEPALIVE:
+            yield ": keep-alive\n\n"
+            idle = 0.0
+
+@app.get("/events", summary="Stream issue and stats deltas (Server-Sent Events)", dependencies=[Depends(get_stream_api_key)])
+async def stream_events(request: Request, since: str = None):
+    """
+    Streams deltas as Storage writes happen: issue.upserted, issue.label_corrected,
+    scores.updated, stats.changed and issues.bulk_loaded.
+    Each event's id is a resume token; reconnecting with Last-Event-ID (or ?since=)
+    replays only what was missed. Pass the `token` from /stats as ?since= to get
+    exactly the deltas after that snapshot. A `reset` event means the client must refetch.
+    """
+    feed = await run_in_threadpool(get_event_feed)
+    # EventSource sends Last-Event-ID when it reconnects, which is newer than the original ?since=
+    token = feed.resolve(since, request.headers.get("Last-Event-ID"))
+    return StreamingResponse(
+        event_stream(request, feed, token, base=since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 app.mount("/dashboard", StaticFiles(directory="../frontend", html=True), name="static")
 
@@ -1,27 +1,25 @@
 import os
-import joblib
 import json
 from typing import List, Tuple
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import make_pipeline
 from src.config import Config
 
+# scikit-learn and joblib are imported inside the methods that need them so that
+# importing this module (and therefore the API) doesn't pull in the ML stack.
+
 class IssueClassifier:
     def __init__(self):
         self.model = None
         self.vectorizer = None
         self.model_path = Config.MODEL_PATH
         self.vectorizer_path = Config.VECTORIZER_PATH
-        
-        # Ensure model directory exists
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        os.makedirs(os.path.dirname(self.vectorizer_path), exist_ok=True)
 
     def train(self, data: List[dict]):
         """
         Trains the model on a list of dicts with 'text' and 'label' keys.
         """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.naive_bayes import MultinomialNB
+
         texts = [item['text'] for item in data]
         labels = [item['label'] for item in data]
         
@@ -48,11 +46,18 @@ class IssueClassifier:
         return self.model.predict(X).tolist()
 
     def save_model(self):
+        import joblib
+
+        # Ensure model directory exists
+        os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+        os.makedirs(os.path.dirname(self.vectorizer_path) or ".", exist_ok=True)
         joblib.dump(self.model, self.model_path)
         joblib.dump(self.vectorizer, self.vectorizer_path)
 
     def load_model(self):
         if os.path.exists(self.model_path) and os.path.exists(self.vectorizer_path):
+            import joblib
+
             self.model = joblib.load(self.model_path)
             self.vectorizer = joblib.load(self.vectorizer_path)
         else:
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, create_engine
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, create_engine, text
 from sqlalchemy.orm import declarative_base
-from datetime import datetime
+from datetime import datetime, timezone
+import time
 
 Base = declarative_base()
 
@@ -8,12 +9,13 @@ class Issue(Base):
     __tablename__ = "issues"
 
     id = Column(Integer, primary_key=True, index=True) # This will be the GitHub Issue ID
-    number = Column(Integer, unique=True, index=True)
+    number = Column(Integer, index=True) # Only unique within a repository
     title = Column(String, index=True)
     body = Column(String, nullable=True)
     state = Column(String)
     created_at = Column(String) # Storing as string for simplicity, or could use DateTime
     html_url = Column(String)
+    repository = Column(String, nullable=True) # "owner/repo"; added to older databases by Storage.create_tables
     
     # Triage fields
     status = Column(String, default="new") # new, triaged
@@ -32,4 +34,96 @@ class Issue(Base):
             "status": self.status,
             "predicted_label": self.predicted_label,
             "priority_score": self.priority_score,
+            "repository": self.repository,
         }
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, index=True) # sync, triage
+    repository = Column(String, nullable=True)
+    dedupe_key = Column(String, nullable=False, default="") # Pending jobs with the same kind + key are coalesced
+    status = Column(String, default="queued", index=True) # queued, running, succeeded, failed
+    progress = Column(Integer, default=0)
+    total = Column(Integer, default=0)
+    message = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, default=0)
+    worker = Column(String, nullable=True)
+
+    # Unix timestamps
+    created_at = Column(Float)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
+    heartbeat_at = Column(Float, nullable=True)
+
+    __table_args__ = (
+        # At most one pending job per (kind, dedupe_key), enforced across processes
+        Index("ix_jobs_pending_unique", "kind", "dedupe_key", unique=True, sqlite_where=text("status = 'queued'")),
+    )
+
+    def to_dict(self):
+        def iso(ts):
+            return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts else None
+
+        duration = None
+        if self.started_at:
+            duration = round((self.finished_at or time.time()) - self.started_at, 3)
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "repository": self.repository,
+            "status": self.status,
+            "progress": self.progress,
+            "total": self.total,
+            "message": self.message,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "queued_seconds": round((self.started_at or time.time()) - self.created_at, 3) if self.created_at else None,
+            "duration_seconds": duration,
+        }
+
+
+# The webhook log lives in its own SQLite file, so its tables aren't created in the issue database
+WebhookBase = declarative_base()
+
+class WebhookEvent(WebhookBase):
+    __tablename__ = "webhook_events"
+
+    id = Column(Integer, primary_key=True, index=True) # Append order
+    delivery_id = Column(String, unique=True, nullable=True) # X-GitHub-Delivery, used to drop redeliveries
+    event = Column(String, nullable=True) # X-GitHub-Event
+    payload = Column(String) # Raw verified request body
+    received_at = Column(Float)
+    processed_at = Column(Float, nullable=True, index=True)
+    error = Column(String, nullable=True)
+
+
+class WebhookIssueVersion(WebhookBase):
+    __tablename__ = "webhook_issue_versions"
+
+    issue_id = Column(Integer, primary_key=True)
+    updated_at = Column(String) # `issue.updated_at` of the newest webhook event applied for this issue
+
+
+class IssueLocation(Base):
+    """Which partition each issue lives in; only used in partitioned storage mode."""
+    __tablename__ = "issue_locations"
+
+    issue_id = Column(Integer, primary_key=True)
+    repository = Column(String, nullable=True) # NULL for the unassigned partition
+
+
+class FeedEvent(Base):
+    __tablename__ = "feed_events"
+
+    id = Column(Integer, primary_key=True) # Resume token for /events clients
+    type = Column(String) # issue.upserted, issue.label_corrected, scores.updated, stats.changed, issues.bulk_loaded
+    data = Column(String) # JSON payload
+    created_at = Column(Float)
@@ -1,31 +1,193 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, func, literal, null, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, Session
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
 from src.config import Config
-from src.models import Base, Issue
+from src.events import EventFeed, FeedSet, SCORES_PER_EVENT, compact_issue, stats_delta
+from src.models import Base, FeedEvent, Issue, IssueLocation, Job
+
+logger = logging.getLogger("IssuePilot.storage")
+
+TRIAGE_FIELDS = ("status", "predicted_label", "priority_score")
+
+# Keeps `IN (...)` lists well under SQLite's bound-parameter limit
+LOOKUP_BATCH = 500
+
+# Partition directory listings are reused once the directory's mtime is this old
+SCAN_SETTLE_NS = 1_000_000_000
+
+def default_db_path() -> str:
+    # Use sqlite:///issue_pilot.db for default
+    return Config.STORAGE_FILE.replace(".json", ".db") if Config.STORAGE_FILE.endswith(".json") else "issue_pilot.db"
+
+def priority_order(item: Dict):
+    """Sort key for issues: highest priority first, then by ID."""
+    return (-(item.get("priority_score") or 0), item.get("id") or 0)
 
 class Storage:
-    def __init__(self):
-        # Use sqlite:///issue_pilot.db for default
-        db_path = Config.STORAGE_FILE.replace(".json", ".db") if Config.STORAGE_FILE.endswith(".json") else "issue_pilot.db"
+    def __init__(self, db_path: str = None, issues_only: bool = False):
+        db_path = db_path or default_db_path()
+        self.db_path = db_path
         self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        # Partitions only hold issues (and their feed); jobs live in the main database
+        self.tables = [Issue.__table__] if issues_only else [Issue.__table__, Job.__table__, FeedEvent.__table__]
+        self.feed: Optional[EventFeed] = None
         self.create_tables()
 
+    def enable_feed(self, retention: int = None):
+        """Publishes a delta to this database's `feed_events` table with every write."""
+        self.feed = EventFeed(self.engine, retention)
+
+    def _publish(self, conn, events):
+        # Runs inside the write's transaction; if publishing fails, so does the write
+        if self.feed is not None and events:
+            self.feed.publish(events, conn)
+
+    def _publish_changes(self, conn, changes: List[Tuple[Optional[Dict], Dict]], event_type: str = None):
+        """
+        Publishes deltas for (before, after) issue snapshots; `before` is None for new issues.
+        Without an explicit event_type, issues whose only changes are triage fields are
+        batched into scores.updated events and everything else is sent as issue.upserted.
+        """
+        if self.feed is None:
+            return
+        changes = [(before, after) for before, after in changes if before != after]
+        events = []
+        scores = []
+        for before, after in changes:
+            if event_type:
+                events.append((event_type, compact_issue(after)))
+            elif before is None or any(before.get(k) != v for k, v in after.items() if k not in TRIAGE_FIELDS):
+                events.append(("issue.upserted", compact_issue(after)))
+            else:
+                scores.append({k: after.get(k) for k in ("id",) + TRIAGE_FIELDS})
+        for i in range(0, len(scores), SCORES_PER_EVENT):
+            events.append(("scores.updated", {"issues": scores[i:i + SCORES_PER_EVENT]}))
+
+        delta = stats_delta([
+            (None if before is None else (before["status"], before["predicted_label"]),
+             (after["status"], after["predicted_label"]))
+            for before, after in changes
+        ])
+        if delta:
+            events.append(("stats.changed", delta))
+        self._publish(conn, events)
+
     def get_session(self) -> Session:
         return self.SessionLocal()
 
-    def load_data(self) -> List[Dict]:
+    def load_data(self, repository: str = None) -> List[Dict]:
         """
-        Returns all issues as dictionaries.
+        Returns all issues as dictionaries, optionally only those of one repository.
         """
         session = self.get_session()
         try:
-            issues = session.query(Issue).all()
-            return [issue.to_dict() for issue in issues]
+            query = session.query(Issue)
+            if repository:
+                query = query.filter(Issue.repository == repository)
+            return [issue.to_dict() for issue in query.all()]
         finally:
             session.close()
 
+    def get_issue(self, issue_id) -> Optional[Dict]:
+        session = self.get_session()
+        try:
+            issue = session.query(Issue).filter(Issue.id == issue_id).first()
+            return issue.to_dict() if issue else None
+        finally:
+            session.close()
+
+    def get_issues(self, issue_ids: List[int]) -> List[Dict]:
+        """Returns those of `issue_ids` that are stored here."""
+        if not issue_ids:
+            return []
+        session = self.get_session()
+        try:
+            return [issue.to_dict() for issue in session.query(Issue).filter(Issue.id.in_(issue_ids)).all()]
+        finally:
+            session.close()
+
+    def delete_issues(self, issue_ids: List[int]):
+        """Deletes issues without publishing; used when an issue moves to another partition."""
+        if not issue_ids:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(Issue.__table__.delete().where(Issue.id.in_(issue_ids)))
+
+    def query_issues(self, status: str = None, min_score: int = 0, repository: str = None,
+                     limit: int = 20, offset: int = 0) -> Tuple[int, List[Dict]]:
+        """
+        Returns (total, page) of issues matching the filters, ordered by priority score descending.
+        """
+        session = self.get_session()
+        try:
+            query = session.query(Issue).filter(func.coalesce(Issue.priority_score, 0) >= min_score)
+            if status:
+                query = query.filter(Issue.status == status)
+            if repository:
+                query = query.filter(Issue.repository == repository)
+            total = query.count()
+            page = (
+                query.order_by(func.coalesce(Issue.priority_score, 0).desc(), Issue.id)
+                .offset(offset)
+                .limit(limit)
+                .all()
+            )
+            return total, [issue.to_dict() for issue in page]
+        finally:
+            session.close()
+
+    def stats(self, repository: str = None) -> Dict:
+        """
+        Returns issue counts by status and by predicted label.
+        With a feed, also returns the feed `token` the counts are current as of.
+        """
+        session = self.get_session()
+        try:
+            query = session.query(literal("count"), Issue.status, Issue.predicted_label, func.count(Issue.id))
+            if repository:
+                query = query.filter(Issue.repository == repository)
+            query = query.group_by(Issue.status, Issue.predicted_label)
+            if self.feed is not None:
+                # One statement, so the counts and the token come from the same snapshot
+                query = query.union_all(
+                    session.query(literal("token"), null(), null(), func.coalesce(func.max(FeedEvent.id), 0))
+                )
+            rows = query.all()
+        finally:
+            session.close()
+
+        total = 0
+        status_counts = {}
+        label_counts = {}
+        token = None
+        for kind, s, l, count in rows:
+            if kind == "token":
+                token = count
+                continue
+            total += count
+            s = s or "unknown"
+            status_counts[s] = status_counts.get(s, 0) + count
+            l = l or "unlabeled"
+            label_counts[l] = label_counts.get(l, 0) + count
+
+        result = {
+            "total": total,
+            "status_counts": status_counts,
+            "label_counts": label_counts
+        }
+        if token is not None:
+            result["token"] = token
+        return result
+
     def create_tables(self):
         """Creates the issues table if it doesn't exist."""
         # Check if repository column exists, if not add it (simple migration)
@@ -42,13 +204,26 @@ class Storage:
                 # Table might not exist yet, which is fine
                 pass
 
-        Base.metadata.create_all(bind=self.engine)
+        # Issue numbers are only unique within a repository; replace the old global unique index
+        with self.engine.begin() as conn:
+            index_sql = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'ix_issues_number'")
+            ).scalar()
+            if index_sql and index_sql.upper().startswith("CREATE UNIQUE"):
+                conn.execute(text("DROP INDEX ix_issues_number"))
+                conn.execute(text("CREATE INDEX ix_issues_number ON issues (number)"))
 
-    def save_issue_result(self, issue_id, result_data):
-        """Saves or updates the analysis result in the database."""
+        Base.metadata.create_all(bind=self.engine, tables=self.tables)
+
+    def save_issue_result(self, issue_id, result_data, previous: Dict = None):
+        """
+        Saves or updates the analysis result in the database.
+        `previous` is the issue's last state in another partition, if it is moving here.
+        """
         session = self.get_session()
         try:
             issue = session.query(Issue).filter(Issue.id == str(issue_id)).first()
+            before = issue.to_dict() if issue else previous
             if not issue:
                 issue = Issue(id=str(issue_id))
                 session.add(issue)
@@ -65,6 +240,9 @@ class Storage:
             issue.priority_score = result_data.get("priority_score", 0)
             issue.repository = result_data.get("repository") # New field
             
+            session.flush()
+            event_type = "issue.label_corrected" if result_data.get("manual_correction") else None
+            self._publish_changes(session.connection(), [(before, issue.to_dict())], event_type)
             session.commit()
         except Exception as e:
             session.rollback()
@@ -72,17 +250,24 @@ class Storage:
         finally:
             session.close()
 
-    def bulk_save(self, issues_data: List[Dict]):
+    def bulk_save(self, issues_data: List[Dict], previous: Dict[int, Dict] = None):
         """
         Saves multiple issues at once.
+        `previous` maps IDs of issues moving in from another partition to their last state there.
         """
+        previous = previous or {}
         session = self.get_session()
+        changes = []
         try:
             for data in issues_data:
                 issue = session.query(Issue).filter(Issue.id == data["id"]).first()
+                before = issue.to_dict() if issue else previous.get(data["id"])
                 if not issue:
                     issue = Issue(id=data["id"])
                     session.add(issue)
+                    if before:
+                        # Partial updates keep the fields the issue had in its old partition
+                        data = {**before, **data}
                 
                 # Update fields
                 if "number" in data: issue.number = data.get("number")
@@ -91,6 +276,7 @@ class Storage:
                 if "state" in data: issue.state = data.get("state")
                 if "created_at" in data: issue.created_at = data.get("created_at")
                 if "html_url" in data: issue.html_url = data.get("html_url")
+                if "repository" in data: issue.repository = data.get("repository")
                 
                 # Only update status if it's new, or forcing update
                 if not issue.status:
@@ -103,10 +289,320 @@ class Storage:
                     issue.priority_score = data["priority_score"]
                 if "status" in data:
                     issue.status = data["status"]
+                changes.append((before, issue.to_dict()))
 
+            session.flush()
+            self._publish_changes(session.connection(), changes)
             session.commit()
         except Exception as e:
             session.rollback()
             raise e
         finally:
             session.close()
+
+    def bulk_upsert(self, issues_data: List[Dict]):
+        """
+        Inserts or fully replaces many issues in a single transaction using
+        INSERT ... ON CONFLICT. Much faster than bulk_save for large batches
+        because it doesn't load each row first.
+        """
+        if not issues_data:
+            return
+        columns = [column.name for column in Issue.__table__.columns]
+        defaults = {"status": "new", "priority_score": 0}
+        rows = [{c: data.get(c, defaults.get(c)) for c in columns} for data in issues_data]
+
+        stmt = sqlite_insert(Issue.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={c: stmt.excluded[c] for c in columns if c != "id"},
+        )
+        # Too many rows for per-issue deltas; clients refetch instead
+        repositories = sorted({row["repository"] for row in rows if row["repository"]})
+        with self.engine.begin() as conn:
+            conn.execute(stmt, rows)
+            self._publish(conn, [("issues.bulk_loaded", {"count": len(rows), "repositories": repositories})])
+
+
+class PartitionedStorage:
+    """
+    Stores each repository's issues in its own SQLite file under
+    STORAGE_PARTITION_DIR, so writes to one repository don't lock the others.
+
+    Single-repository calls go straight to that repository's partition.
+    Calls spanning repositories fan out across partitions in parallel and
+    merge the per-partition results. Partition files created by other
+    processes are picked up on the next lookup. Jobs stay in the main
+    database (`engine`).
+
+    The `issue_locations` table in the main database records which partition
+    each issue lives in. Writes and `get_issue` use it instead of searching
+    every partition. An issue whose repository changes (e.g. filled in by a
+    later sync) moves partitions instead of being duplicated. The old copy
+    is deleted only after the new one and its location are committed.
+    """
+
+    UNASSIGNED = "_unassigned" # Partition for issues without a repository
+
+    def __init__(self, partition_dir: str = None, fanout_workers: int = None):
+        self.main = Storage()
+        self.engine = self.main.engine
+        self.partition_dir = partition_dir or Config.STORAGE_PARTITION_DIR
+        os.makedirs(self.partition_dir, exist_ok=True)
+
+        self.partitions: Dict[Optional[str], Storage] = {}
+        self.feed: Optional[FeedSet] = None
+        self.feed_retention: Optional[int] = None
+        self._scanned_stamp: Optional[int] = None
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=fanout_workers or Config.STORAGE_FANOUT_WORKERS,
+            thread_name_prefix="storage-fanout",
+        )
+
+        IssueLocation.__table__.create(bind=self.engine, checkfirst=True)
+        self._scan()
+        if not self._has_locations():
+            self.index_locations()
+        if self._main_issue_count():
+            logger.warning("The main database still has issues that partitioned mode doesn't read. "
+                           "Run `python -m src.storage migrate` to move them into partitions.")
+
+    def _path(self, repository: Optional[str]) -> str:
+        # GitHub owner names can't contain "_", so "owner__repo" maps back unambiguously
+        filename = (repository.replace("/", "__", 1) if repository else self.UNASSIGNED) + ".db"
+        return os.path.join(self.partition_dir, filename)
+
+    def _scan(self):
+        """Opens partition files that aren't open yet, including ones created by other processes."""
+        stamp = os.stat(self.partition_dir).st_mtime_ns
+        if stamp == self._scanned_stamp:
+            return
+        for filename in os.listdir(self.partition_dir):
+            if filename.endswith(".db"):
+                name = filename[:-3]
+                self.partition(None if name == self.UNASSIGNED else name.replace("__", "/", 1))
+        # A file created within the same timestamp tick wouldn't change the stamp, so only trust settled ones
+        self._scanned_stamp = stamp if time.time_ns() - stamp > SCAN_SETTLE_NS else None
+
+    def partition(self, repository: Optional[str], create: bool = True) -> Optional[Storage]:
+        repository = repository or None
+        storage = self.partitions.get(repository)
+        if storage is None and (create or os.path.exists(self._path(repository))):
+            with self._lock:
+                storage = self.partitions.get(repository)
+                if storage is None:
+                    storage = Storage(self._path(repository), issues_only=True)
+                    if self.feed is not None:
+                        storage.enable_feed(self.feed_retention)
+                    self.partitions[repository] = storage
+        return storage
+
+    def enable_feed(self, retention: int = None):
+        """
+        Gives every partition its own feed, written in the same transaction as
+        the partition's issues, and exposes them together as `feed`.
+        """
+        with self._lock:
+            self.feed_retention = retention
+            self.feed = FeedSet(self._feeds)
+            for storage in self.partitions.values():
+                storage.enable_feed(retention)
+
+    @staticmethod
+    def _name(storage: Storage) -> str:
+        return os.path.splitext(os.path.basename(storage.db_path))[0]
+
+    def _feeds(self) -> Dict[str, EventFeed]:
+        return {self._name(storage): storage.feed for storage in self._targets()}
+
+    def _targets(self, repository: str = None) -> List[Storage]:
+        if repository:
+            storage = self.partition(repository, create=False)
+            return [storage] if storage else []
+        self._scan()
+        with self._lock:
+            return list(self.partitions.values())
+
+    def _fan_out(self, fn, targets: List[Storage]) -> List:
+        if len(targets) <= 1:
+            return [fn(storage) for storage in targets]
+        return list(self.executor.map(fn, targets))
+
+    def _group(self, issues_data: List[Dict]) -> Dict[Optional[str], List[Dict]]:
+        groups = {}
+        for data in issues_data:
+            groups.setdefault(data.get("repository") or None, []).append(data)
+        return groups
+
+    def load_data(self, repository: str = None) -> List[Dict]:
+        results = self._fan_out(lambda storage: storage.load_data(), self._targets(repository))
+        return list(itertools.chain.from_iterable(results))
+
+    def get_issue(self, issue_id) -> Optional[Dict]:
+        located = self._locate([int(issue_id)])
+        if int(issue_id) not in located:
+            return None
+        storage = self.partition(located[int(issue_id)], create=False)
+        return storage.get_issue(issue_id) if storage else None
+
+    def query_issues(self, status: str = None, min_score: int = 0, repository: str = None,
+                     limit: int = 20, offset: int = 0) -> Tuple[int, List[Dict]]:
+        # Each partition returns its own top offset+limit; a k-way merge picks the global page
+        results = self._fan_out(
+            lambda storage: storage.query_issues(status, min_score, None, limit=offset + limit, offset=0),
+            self._targets(repository),
+        )
+        total = sum(count for count, _ in results)
+        merged = heapq.merge(*(items for _, items in results), key=priority_order)
+        return total, list(itertools.islice(merged, offset, offset + limit))
+
+    def stats(self, repository: str = None) -> Dict:
+        combined = {"total": 0, "status_counts": {}, "label_counts": {}}
+        targets = self._targets(repository)
+        positions = {}
+        for storage, result in zip(targets, self._fan_out(lambda storage: storage.stats(), targets)):
+            combined["total"] += result["total"]
+            for key in ("status_counts", "label_counts"):
+                for name, count in result[key].items():
+                    combined[key][name] = combined[key].get(name, 0) + count
+            if "token" in result:
+                positions[self._name(storage)] = result["token"]
+        if self.feed is not None:
+            if repository:
+                # Other partitions don't affect these counts; resume them from their latest event
+                positions = dict(FeedSet.parse(self.feed.latest()), **positions)
+            combined["token"] = FeedSet.format(positions)
+        return combined
+
+    def _has_locations(self) -> bool:
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT 1 FROM issue_locations LIMIT 1")).first() is not None
+
+    def _locate(self, issue_ids: List[int]) -> Dict[int, Optional[str]]:
+        """Returns the repository partition of each known issue."""
+        locations = {}
+        with self.engine.connect() as conn:
+            for i in range(0, len(issue_ids), LOOKUP_BATCH):
+                rows = conn.execute(
+                    IssueLocation.__table__.select().where(
+                        IssueLocation.issue_id.in_(issue_ids[i:i + LOOKUP_BATCH]))
+                )
+                locations.update((row.issue_id, row.repository) for row in rows)
+        return locations
+
+    def _record_locations(self, locations: Dict[int, Optional[str]]):
+        if not locations:
+            return
+        stmt = sqlite_insert(IssueLocation.__table__)
+        stmt = stmt.on_conflict_do_update(index_elements=["issue_id"], set_={"repository": stmt.excluded.repository})
+        with self.engine.begin() as conn:
+            conn.execute(stmt, [{"issue_id": issue_id, "repository": repository}
+                                for issue_id, repository in locations.items()])
+
+    def index_locations(self):
+        """Records the location of every partitioned issue. Used once for partitions written before the index existed."""
+        for repository, storage in list(self.partitions.items()):
+            with storage.engine.connect() as conn:
+                ids = [row.id for row in conn.execute(text("SELECT id FROM issues"))]
+            self._record_locations({issue_id: repository for issue_id in ids})
+
+    def _write(self, issues_data: List[Dict], write):
+        """
+        Routes issues to their repository's partition with `write(storage, group, previous)`,
+        where `previous` holds the last state of issues moving in from another partition.
+        Data without a "repository" key stays in the issue's current partition.
+        """
+        located = self._locate([data["id"] for data in issues_data])
+        groups = {}
+        home = {}
+        for data in issues_data:
+            repository = (data.get("repository") if "repository" in data else located.get(data["id"])) or None
+            groups.setdefault(repository, []).append(data)
+            home[data["id"]] = repository
+
+        changed = {issue_id: repository for issue_id, repository in home.items()
+                   if issue_id not in located or located[issue_id] != repository}
+        moved = {}
+        for issue_id in changed:
+            if issue_id in located:
+                moved.setdefault(located[issue_id], []).append(issue_id)
+
+        previous = {}
+        for repository, issue_ids in moved.items():
+            storage = self.partition(repository, create=False)
+            if storage:
+                previous.update((issue["id"], issue) for issue in storage.get_issues(issue_ids))
+
+        self._fan_out(lambda item: write(self.partition(item[0]), item[1], previous), list(groups.items()))
+        self._record_locations(changed)
+        for repository, issue_ids in moved.items():
+            storage = self.partition(repository, create=False)
+            if storage:
+                storage.delete_issues(issue_ids)
+
+    def save_issue_result(self, issue_id, result_data):
+        # A full replace: a missing repository means the unassigned partition, as in Storage
+        self._write(
+            [dict(result_data, id=int(issue_id), repository=result_data.get("repository"))],
+            lambda storage, group, previous: storage.save_issue_result(
+                issue_id, result_data, previous.get(int(issue_id))),
+        )
+
+    def bulk_save(self, issues_data: List[Dict]):
+        self._write(issues_data, lambda storage, group, previous: storage.bulk_save(group, previous))
+
+    def bulk_upsert(self, issues_data: List[Dict]):
+        self._write(issues_data, lambda storage, group, previous: storage.bulk_upsert(group))
+
+    def _main_issue_count(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM issues")).scalar()
+
+    def migrate_from_main(self, batch_size: int = 5000) -> int:
+        """
+        Moves issues from the main database's issues table into partitions and
+        returns how many were moved. Issues already in a partition keep their
+        partition copy, since it was written after partitioning was enabled.
+        Safe to rerun after an interruption.
+        """
+        moved = 0
+        while True:
+            session = self.main.get_session()
+            try:
+                batch = [issue.to_dict() for issue in session.query(Issue).order_by(Issue.id).limit(batch_size).all()]
+            finally:
+                session.close()
+            if not batch:
+                return moved
+
+            ids = [issue["id"] for issue in batch]
+            partitioned = self._locate(ids)
+            issues = [issue for issue in batch if issue["id"] not in partitioned]
+            groups = self._group(issues)
+            self._fan_out(lambda item: self.partition(item[0]).bulk_upsert(item[1]), list(groups.items()))
+            self._record_locations({issue["id"]: issue["repository"] or None for issue in issues})
+            self.main.delete_issues(ids)
+            moved += len(issues)
+            logger.info(f"Moved {moved} issues into partitions.")
+
+
+def create_storage():
+    """
+    Returns the storage backend selected by STORAGE_MODE ("single" or "partitioned"),
+    publishing its writes to the /events feed.
+    """
+    storage = PartitionedStorage() if Config.STORAGE_MODE == "partitioned" else Storage()
+    storage.enable_feed()
+    return storage
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["migrate"]:
+        sys.exit("Usage: python -m src.storage migrate")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    storage = PartitionedStorage()
+    storage.enable_feed()
+    print(f"Moved {storage.migrate_from_main()} issues from the main database into {storage.partition_dir}.")
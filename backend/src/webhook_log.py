@@ -0,0 +1,196 @@
+import json
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.event import listen
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from src.config import Config
+from src.models import WebhookBase, WebhookEvent, WebhookIssueVersion
+
+logger = logging.getLogger("IssuePilot.webhook")
+
+ISSUE_ACTIONS = ("opened", "reopened", "edited")
+
+
+def to_internal_issue(payload: Dict) -> Optional[Dict]:
+    """
+    Adapts an `issues` webhook payload to our internal issue format.
+    Returns None for actions we don't ingest.
+    """
+    action = payload.get("action")
+    issue = payload.get("issue")
+    if action not in ISSUE_ACTIONS or not issue:
+        return None
+
+    internal_issue = {
+        "id": issue.get("id"),
+        "number": issue.get("number"),
+        "title": issue.get("title"),
+        "body": issue.get("body") or "",
+        "state": issue.get("state"),
+        "created_at": issue.get("created_at"),
+        "html_url": issue.get("html_url"),
+        "status": "new",
+        "predicted_label": None,
+        "priority_score": 0
+    }
+    repository = (payload.get("repository") or {}).get("full_name")
+    if repository:
+        internal_issue["repository"] = repository
+    return internal_issue
+
+
+class WebhookLog:
+    """
+    Durable append-only log of verified webhook deliveries.
+
+    The log has its own SQLite file in WAL mode, so appending never waits on
+    the issue database. The webhook endpoint only appends the raw body and
+    acknowledges. Events are applied later in batches by `drain`, which keeps
+    only the newest event per issue. Events older than what was already
+    applied for that issue are skipped, even if they arrive in a later batch.
+    A batch is marked processed only after it has been applied, so a crash
+    mid-batch replays it rather than losing it.
+    """
+
+    def __init__(self, db_path: str = None, busy_timeout: float = None):
+        self.engine = create_engine(
+            f"sqlite:///{db_path or Config.WEBHOOK_LOG_FILE}",
+            connect_args={
+                "check_same_thread": False,
+                "timeout": Config.WEBHOOK_LOG_BUSY_TIMEOUT if busy_timeout is None else busy_timeout,
+            },
+        )
+        listen(self.engine, "connect", self._configure_connection)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        WebhookBase.metadata.create_all(bind=self.engine)
+
+    @staticmethod
+    def _configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+    def append(self, body: bytes, delivery_id: str = None, event: str = None) -> bool:
+        """
+        Appends a delivery to the log. Returns False if this delivery ID was already logged.
+        """
+        session = self.SessionLocal()
+        try:
+            session.add(WebhookEvent(
+                delivery_id=delivery_id or None,
+                event=event,
+                payload=body.decode("utf-8"),
+                received_at=time.time(),
+            ))
+            session.commit()
+            return True
+        except IntegrityError:
+            session.rollback()
+            return False
+        finally:
+            session.close()
+
+    def pending_count(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM webhook_events WHERE processed_at IS NULL")).scalar()
+
+    def drain(self, apply: Callable[[List[Dict]], None], batch_size: int = 500,
+              progress: Callable[..., None] = None) -> int:
+        """
+        Applies all pending events in batches and returns how many issues were applied.
+        `apply` receives the coalesced internal issues of one batch.
+        """
+        applied = 0
+        seen = 0
+        while True:
+            session = self.SessionLocal()
+            try:
+                batch = (
+                    session.query(WebhookEvent)
+                    .filter(WebhookEvent.processed_at.is_(None))
+                    .order_by(WebhookEvent.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not batch:
+                    return applied
+
+                issues = self._skip_stale(session, self._coalesce(batch))
+                if issues:
+                    apply([issue for issue, _ in issues])
+
+                # Only mark the batch (and record versions) once it has been applied
+                now = time.time()
+                for event in batch:
+                    event.processed_at = now
+                for issue, updated_at in issues:
+                    session.merge(WebhookIssueVersion(issue_id=issue["id"], updated_at=updated_at))
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+            applied += len(issues)
+            seen += len(batch)
+            if progress:
+                progress(seen, seen + self.pending_count(), f"{applied} issues applied")
+
+    def prune(self, older_than_seconds: float) -> int:
+        """Deletes processed events older than the cutoff. Their delivery IDs stop being deduplicated."""
+        cutoff = time.time() - older_than_seconds
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                text("DELETE FROM webhook_events WHERE processed_at IS NOT NULL AND processed_at < :cutoff"),
+                {"cutoff": cutoff},
+            )
+            return result.rowcount
+
+    def _skip_stale(self, session, issues: List[tuple]) -> List[tuple]:
+        """Drops issues whose event is older than the version already applied."""
+        if not issues:
+            return issues
+        ids = [issue["id"] for issue, _ in issues]
+        applied = dict(
+            session.query(WebhookIssueVersion.issue_id, WebhookIssueVersion.updated_at)
+            .filter(WebhookIssueVersion.issue_id.in_(ids))
+            .all()
+        )
+        return [
+            (issue, updated_at) for issue, updated_at in issues
+            if issue["id"] not in applied or updated_at >= (applied[issue["id"]] or "")
+        ]
+
+    def _coalesce(self, batch: List[WebhookEvent]) -> List[tuple]:
+        """
+        Keeps the most recently updated event per issue ID.
+        Returns (internal issue, issue updated_at) pairs.
+        """
+        latest: Dict[int, tuple] = {}
+        for event in batch:
+            if event.event and event.event != "issues":
+                continue
+            try:
+                payload = json.loads(event.payload)
+            except ValueError as e:
+                event.error = f"Invalid JSON: {e}"
+                logger.warning(f"Skipping webhook event {event.id}: {event.error}")
+                continue
+
+            issue = to_internal_issue(payload)
+            if issue is None or issue["id"] is None:
+                continue
+
+            # GitHub doesn't guarantee delivery order; prefer the issue's own updated_at
+            order = ((payload.get("issue") or {}).get("updated_at") or "", event.id)
+            current = latest.get(issue["id"])
+            if current is None or order > current[0]:
+                latest[issue["id"]] = (order, issue)
+
+        return [(issue, order[0]) for order, issue in latest.values()]
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import create_engine
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """A file-backed SQLite engine usable from worker threads, like Storage's."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def webhook_log(tmp_path):
+    """A WebhookLog in its own WAL file, as the app runs it."""
+    from src.webhook_log import WebhookLog
+    log = WebhookLog(str(tmp_path / "webhooks.db"))
+    yield log
+    log.engine.dispose()
+
+@pytest.fixture
+def partitioned_storage(tmp_path, monkeypatch):
+    """A PartitionedStorage whose main database and partitions live under tmp_path."""
+    from src.storage import PartitionedStorage
+    monkeypatch.setattr("src.config.Config.STORAGE_FILE", str(tmp_path / "main.json"))
+    storage = PartitionedStorage(partition_dir=str(tmp_path / "partitions"), fanout_workers=4)
+    yield storage
+    storage.executor.shutdown()
+
+@pytest.fixture
+def feed_storage(tmp_path):
+    """A single-file Storage publishing to its /events feed."""
+    from src.storage import Storage
+    storage = Storage(str(tmp_path / "events.db"))
+    storage.enable_feed()
+    yield storage
+    storage.engine.dispose()
+
+@pytest.fixture
+def isolated_app(tmp_path, monkeypatch):
+    """Points the app's lazily built components at tmp_path instead of the tracked storage.db."""
+    from src import main
+    from src.config import Config
+    monkeypatch.setattr(Config, "STORAGE_FILE", str(tmp_path / "storage.json"))
+    monkeypatch.setattr(Config, "WEBHOOK_LOG_FILE", str(tmp_path / "webhooks.db"))
+    monkeypatch.setattr(Config, "STORAGE_PARTITION_DIR", str(tmp_path / "partitions"))
+    monkeypatch.setattr(main, "_components", {})
+    yield main.app
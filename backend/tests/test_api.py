@@ -2,9 +2,13 @@ from fastapi.testclient import TestClient
 from src.main import app
 import os
 import json
+import pytest
 
 client = TestClient(app)
 
+# Every test gets fresh components on a temporary database, never the tracked storage.db
+pytestmark = pytest.mark.usefixtures("isolated_app")
+
 def test_read_main():
     response = client.get("/docs")
     assert response.status_code == 200
@@ -63,3 +67,8 @@ def test_list_issues_repo_filter():
     # We expect items (if any) to match the repo, but since DB might be empty or mocked, 
     # we just check the structure and status is correct.
     assert isinstance(data["items"], list)
+
+def test_job_status_not_found():
+    headers = {"X-API-Key": "dev-secret-key"}
+    response = client.get("/jobs/999999", headers=headers)
+    assert response.status_code == 404
@@ -0,0 +1,93 @@
+import gzip
+import json
+import os
+import pytest
+from src.backfill import backfill
+from src.config import Config
+from src.ml_model import IssueClassifier
+from src.storage import Storage
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "labeled_issues.json")
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "MODEL_PATH", str(tmp_path / "model" / "model.pkl"))
+    monkeypatch.setattr(Config, "VECTORIZER_PATH", str(tmp_path / "model" / "vectorizer.pkl"))
+    monkeypatch.setattr(Config, "STORAGE_FILE", str(tmp_path / "backfill.json"))
+    with open(DATA_PATH) as f:
+        IssueClassifier().train(json.load(f))
+    return Storage()
+
+def write_dump(path, lines):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line + "\n")
+
+def api_issue(issue_id, title, **extra):
+    item = {
+        "id": issue_id,
+        "number": issue_id,
+        "title": title,
+        "body": None,
+        "state": "open",
+        "created_at": "2024-01-01T00:00:00Z",
+        "html_url": f"https://github.com/owner/repo/issues/{issue_id}",
+        "repository_url": "https://api.github.com/repos/owner/repo",
+        "labels": [{"name": "triage"}],
+    }
+    item.update(extra)
+    return json.dumps(item)
+
+def test_backfill_triages_and_resumes(tmp_path, storage):
+    dump = str(tmp_path / "issues.jsonl.gz")
+    write_dump(dump, [
+        api_issue(1, "Application crash on startup"),
+        api_issue(2, "Add dark mode theme"),
+        api_issue(3, "Some pull request", pull_request={}),
+        "{not json",
+        api_issue(4, "Typo in README"),
+    ])
+
+    summary = backfill(dump, storage, workers=1, chunk_size=2, batch_size=2)
+    assert summary["written"] == 3
+    assert summary["last_line"] == 5
+
+    issues = {item["id"]: item for item in storage.load_data()}
+    assert set(issues) == {1, 2, 4}
+    assert all(item["status"] == "triaged" for item in issues.values())
+    assert all(item["predicted_label"] for item in issues.values())
+    assert issues[1]["repository"] == "owner/repo"
+
+    # A second run resumes from the checkpoint and has nothing left to do
+    assert backfill(dump, storage, workers=1)["written"] == 0
+    assert backfill(dump, storage, workers=1, resume=False)["written"] == 3
+    assert len(storage.load_data()) == 3
+
+def test_parallel_backfill_checkpoints_in_input_order(tmp_path, storage, monkeypatch):
+    from src import backfill as backfill_module
+
+    dump = str(tmp_path / "issues.jsonl.gz")
+    titles = ["Application crash on startup", "Add dark mode theme", "Typo in README"]
+    lines = [api_issue(i, titles[i % 3]) for i in range(1, 13)]
+    lines.insert(5, api_issue(99, "Some pull request", pull_request={}))
+    write_dump(dump, lines)
+
+    checkpoints = []
+    save_checkpoint = backfill_module.save_checkpoint
+    def record(checkpoint_path, input_path, line, written):
+        checkpoints.append((line, written))
+        save_checkpoint(checkpoint_path, input_path, line, written)
+    monkeypatch.setattr(backfill_module, "save_checkpoint", record)
+
+    # One issue per chunk keeps several futures in flight across the two processes
+    summary = backfill(dump, storage, workers=2, chunk_size=1, batch_size=5)
+    assert summary["written"] == 12
+    assert summary["last_line"] == 13
+    assert checkpoints == sorted(checkpoints)
+    assert checkpoints[-1] == (13, 12)
+
+    issues = storage.load_data()
+    assert len(issues) == 12
+    assert all(item["status"] == "triaged" and item["predicted_label"] for item in issues)
+    with open(dump + ".checkpoint.json") as f:
+        assert json.load(f)["line"] == 13
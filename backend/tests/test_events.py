@@ -0,0 +1,155 @@
+import asyncio
+import json
+import pytest
+from sqlalchemy import create_engine, text
+from src.events import EventFeed
+from src.main import event_stream
+
+def read_all(feed, after=0):
+    return [(event["type"], json.loads(event["data"])) for event in feed.read(after)]
+
+def test_storage_writes_publish_deltas(feed_storage):
+    storage = feed_storage
+    feed = storage.feed
+    issue = {"id": 1, "number": 1, "title": "Crash", "body": "long body", "repository": "owner/repo"}
+
+    storage.bulk_save([issue])
+    events = read_all(feed)
+    assert [event_type for event_type, _ in events] == ["issue.upserted", "stats.changed"]
+    assert "body" not in events[0][1]
+    assert events[1][1] == {"total": 1, "status_counts": {"new": 1}, "label_counts": {"unlabeled": 1}}
+
+    # Re-saving unchanged data (as /sync does) publishes nothing
+    _, latest = feed.bounds()
+    storage.bulk_save([issue])
+    assert feed.read(latest) == []
+
+    # Triage-only changes are batched into scores.updated
+    storage.bulk_save([{"id": 1, "predicted_label": "bug", "priority_score": 40, "status": "triaged"}])
+    events = read_all(feed, latest)
+    assert events[0] == ("scores.updated", {"issues": [
+        {"id": 1, "status": "triaged", "predicted_label": "bug", "priority_score": 40}
+    ]})
+    assert events[1] == ("stats.changed", {
+        "total": 0,
+        "status_counts": {"new": -1, "triaged": 1},
+        "label_counts": {"unlabeled": -1, "bug": 1},
+    })
+
+    _, latest = feed.bounds()
+    corrected = dict(storage.get_issue(1), predicted_label="feature", manual_correction=True)
+    storage.save_issue_result(1, corrected)
+    events = read_all(feed, latest)
+    assert events[0][0] == "issue.label_corrected"
+    assert events[0][1]["predicted_label"] == "feature"
+
+    _, latest = feed.bounds()
+    storage.bulk_upsert([dict(issue, id=2, number=2), dict(issue, id=3, number=3)])
+    assert read_all(feed, latest) == [("issues.bulk_loaded", {"count": 2, "repositories": ["owner/repo"]})]
+
+def test_feed_retention(feed_storage):
+    feed = EventFeed(feed_storage.engine, retention=3)
+    feed.publish([("stats.changed", {"total": i}) for i in range(5)])
+    assert feed.bounds() == (3, 5)
+
+class FakeRequest:
+    def __init__(self, polls):
+        self.polls = polls
+
+    async def is_disconnected(self):
+        self.polls -= 1
+        return self.polls < 0
+
+def collect_stream(feed, token):
+    async def run():
+        return [chunk async for chunk in event_stream(FakeRequest(polls=1), feed, token)]
+    return "".join(asyncio.run(run()))
+
+def test_event_stream_resumes_from_token(feed_storage):
+    feed_storage.enable_feed(retention=3)
+    feed = feed_storage.feed
+    feed.publish([("stats.changed", {"total": i}) for i in range(3)])
+
+    # New clients start at the latest token
+    assert "id: 3\nevent: ready" in collect_stream(feed, None)
+
+    # Reconnecting clients only get what they missed
+    body = collect_stream(feed, 2)
+    assert "id: 3\nevent: stats.changed" in body
+    assert "id: 2\n" not in body
+
+    # Clients too far behind are told to refetch
+    feed.publish([("stats.changed", {"total": i}) for i in range(3)])
+    assert "event: reset" in collect_stream(feed, 1)
+
+def test_failed_publish_rolls_back_write(feed_storage, monkeypatch):
+    def broken(events, conn=None):
+        raise RuntimeError("feed unavailable")
+
+    monkeypatch.setattr(feed_storage.feed, "publish", broken)
+    with pytest.raises(RuntimeError):
+        feed_storage.bulk_save([{"id": 1, "number": 1, "title": "Crash"}])
+    assert feed_storage.load_data() == []
+
+def test_stats_token_matches_snapshot(feed_storage):
+    feed_storage.bulk_save([{"id": 1, "number": 1, "title": "Crash"}])
+    stats = feed_storage.stats()
+    assert stats["token"] == feed_storage.feed.latest()
+
+    feed_storage.bulk_save([{"id": 2, "number": 2, "title": "Hang"}])
+    body = collect_stream(feed_storage.feed, stats["token"])
+    assert "event: ready" not in body
+    assert '"total": 1' in body
+
+def test_partitions_publish_to_their_own_feed(partitioned_storage):
+    storage = partitioned_storage
+    storage.enable_feed()
+    storage.bulk_save([{"id": 1, "number": 1, "repository": "owner/a"}])
+    stats = storage.stats()
+    assert stats["total"] == 1
+    assert stats["token"] == storage.feed.latest()
+
+    # The main database gets no feed writes
+    with storage.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM feed_events")).scalar() == 0
+
+    storage.bulk_save([{"id": 2, "number": 1, "repository": "owner/b"}])
+    storage.save_issue_result(3, {"number": 2, "repository": "owner/a", "status": "triaged"})
+    events = storage.feed.read(stats["token"])
+    assert [event["type"] for event in events] == ["issue.upserted", "stats.changed"] * 2
+
+    # Each event's token resumes after it, across partitions
+    assert storage.feed.read(events[1]["id"]) == events[2:]
+    assert storage.feed.resumable(events[-1]["id"])
+    assert not storage.feed.resumable("garbage")
+    assert "event: issue.upserted" in collect_stream(storage.feed, stats["token"])
+
+def test_latest_tracks_writes_from_other_connections(feed_storage):
+    feed = feed_storage.feed
+    assert feed.latest() == 0
+
+    # Another process writing the same file is seen through SQLite's change counter
+    other = EventFeed(create_engine(f"sqlite:///{feed_storage.db_path}"))
+    other.publish([("stats.changed", {"total": 1})])
+    assert feed.latest() == 1
+    assert feed.latest() == 1
+
+def test_partitioned_stream_ids_are_relative_to_since(partitioned_storage):
+    storage = partitioned_storage
+    storage.enable_feed()
+    storage.bulk_save([{"id": i, "number": i, "repository": f"owner/repo-{i}"} for i in range(20)])
+    since = storage.stats()["token"]
+
+    storage.bulk_save([{"id": 3, "title": "Edited"}])
+    events = storage.feed.read(since, base=since)
+    assert [(event["type"], event["id"]) for event in events] == [("issue.upserted", "+owner__repo-3:3")]
+
+    # Reconnecting with Last-Event-ID and the same ?since= resumes exactly
+    resumed = storage.feed.resolve(since, events[-1]["id"])
+    assert resumed == storage.feed.latest()
+    assert storage.feed.resumable(resumed)
+
+    # A relative ID without its base can't be resumed
+    assert not storage.feed.resumable(storage.feed.resolve(None, events[-1]["id"]))
+    body = collect_stream(storage.feed, storage.feed.resolve(None, events[-1]["id"]))
+    assert "event: reset" in body
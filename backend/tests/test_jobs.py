@@ -0,0 +1,128 @@
+import time
+from src.jobs import JobQueue
+
+def test_enqueue_coalesces_pending_jobs(sqlite_engine):
+    queue = JobQueue(sqlite_engine, workers=0)
+    queue.register("sync", lambda repo, progress: None)
+    queue.register("triage", lambda repo, progress: None)
+
+    first = queue.enqueue("sync", "owner/repo")
+    second = queue.enqueue("sync", "owner/repo")
+    other = queue.enqueue("sync", "owner/other")
+    assert not first["deduplicated"]
+    assert second["deduplicated"]
+    assert second["id"] == first["id"]
+    assert other["id"] != first["id"]
+
+    assert queue.enqueue("triage")["id"] == queue.enqueue("triage")["id"]
+
+def test_run_pending_records_progress_and_failures(sqlite_engine):
+    queue = JobQueue(sqlite_engine, workers=0)
+
+    def sync(repo, progress):
+        progress(3, 3)
+        return f"synced {repo}"
+
+    def triage(repo, progress):
+        raise RuntimeError("model missing")
+
+    queue.register("sync", sync)
+    queue.register("triage", triage)
+    sync_job = queue.enqueue("sync", "owner/repo")
+    triage_job = queue.enqueue("triage")
+
+    assert queue.run_pending() == 2
+
+    done = queue.get(sync_job["id"])
+    assert done["status"] == "succeeded"
+    assert done["progress"] == 3 and done["total"] == 3
+    assert done["message"] == "synced owner/repo"
+    assert done["duration_seconds"] is not None
+
+    failed = queue.get(triage_job["id"])
+    assert failed["status"] == "failed"
+    assert "model missing" in failed["error"]
+
+    # Finished jobs no longer block new ones
+    assert queue.enqueue("sync", "owner/repo")["id"] != sync_job["id"]
+
+def test_stale_running_jobs_are_requeued(sqlite_engine):
+    queue = JobQueue(sqlite_engine, workers=0, lease_seconds=0.01)
+    queue.register("sync", lambda repo, progress: "ok")
+    job = queue.enqueue("sync", "owner/repo")
+
+    # Simulate a worker that claimed the job and then died
+    assert queue.claim_next()["id"] == job["id"]
+    time.sleep(0.05)
+    queue.recover_stale()
+    assert queue.get(job["id"])["status"] == "queued"
+
+    assert queue.run_pending() == 1
+    recovered = queue.get(job["id"])
+    assert recovered["status"] == "succeeded"
+    assert recovered["attempts"] == 2
+
+def test_issue_writers_are_serialized_per_repository(sqlite_engine):
+    queue = JobQueue(sqlite_engine, workers=0)
+    for kind in ("sync", "triage"):
+        queue.register(kind, lambda repo, progress: None, writes_issues=True)
+    queue.register("report", lambda repo, progress: None)
+
+    sync_a = queue.enqueue("sync", "owner/a")
+    sync_b = queue.enqueue("sync", "owner/b")
+    triage = queue.enqueue("triage")
+    report = queue.enqueue("report")
+
+    # Syncs of different repositories may overlap
+    assert queue.claim_next()["id"] == sync_a["id"]
+    assert queue.claim_next()["id"] == sync_b["id"]
+    # Triage spans all repositories, so it waits; jobs that don't write issues don't
+    assert queue.claim_next()["id"] == report["id"]
+    assert queue.claim_next() is None
+
+    queue._update(sync_a["id"], status="succeeded")
+    queue._update(sync_b["id"], status="succeeded")
+    assert queue.claim_next()["id"] == triage["id"]
+
+    # ...and while it runs, no other writer starts
+    queue.enqueue("sync", "owner/a")
+    assert queue.claim_next() is None
+
+def test_worker_survives_status_write_failures(sqlite_engine, monkeypatch):
+    queue = JobQueue(sqlite_engine, workers=1, poll_interval=0.01)
+    monkeypatch.setattr("src.jobs.time.sleep", lambda seconds: None)
+    ran = []
+    queue.register("sync", lambda repo, progress: ran.append(repo))
+
+    real_update = queue._update
+    failures = {"left": 2}
+
+    def flaky_update(job_id, **fields):
+        if fields.get("status") and failures["left"]:
+            failures["left"] -= 1
+            raise RuntimeError("database is locked")
+        return real_update(job_id, **fields)
+
+    def wait_for(condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            queue._stop.wait(0.01)
+        return condition()
+
+    monkeypatch.setattr(queue, "_update", flaky_update)
+    retried = queue.enqueue("sync", "owner/a")
+    queue.start()
+    try:
+        # The final status write is retried until it sticks
+        assert wait_for(lambda: queue.get(retried["id"])["status"] == "succeeded")
+
+        # Even when every retry fails, the worker thread keeps going
+        failures["left"] = 100
+        queue.enqueue("sync", "owner/b")
+        assert wait_for(lambda: ran == ["owner/a", "owner/b"])
+        failures["left"] = 0
+        last = queue.enqueue("sync", "owner/c")
+        assert wait_for(lambda: queue.get(last["id"])["status"] == "succeeded")
+        assert all(t.is_alive() for t in queue._threads)
+    finally:
+        queue.stop()
@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing the app used to take >2s because scikit-learn was imported eagerly.
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+
+STARTUP_SCRIPT = """
+import hashlib, hmac, json, sys, threading, time
+
+start = time.perf_counter()
+import src.main
+import_seconds = time.perf_counter() - start
+
+# Hold the model load so the checks below run while the warm-up thread is still busy
+from src.ml_model import IssueClassifier
+release = threading.Event()
+load_model = IssueClassifier.load_model
+def gated_load_model(self):
+    release.wait(30)
+    load_model(self)
+IssueClassifier.load_model = gated_load_model
+
+from fastapi.testclient import TestClient
+with TestClient(src.main.app) as client:
+    warming_up = any(thread.name == "model-warmup" for thread in threading.enumerate())
+    root_status = client.get("/").status_code
+
+    body = json.dumps({"action": "opened", "issue": {"id": 1, "number": 1, "title": "t"}}).encode()
+    signature = "sha256=" + hmac.new(b"test-secret", body, hashlib.sha256).hexdigest()
+    webhook_status = client.post("/webhook", content=body, headers={
+        "X-Hub-Signature-256": signature,
+        "X-GitHub-Delivery": "startup-check",
+        "X-GitHub-Event": "issues",
+    }).status_code
+
+    still_warming_up = any(thread.name == "model-warmup" for thread in threading.enumerate())
+    sklearn_loaded = "sklearn" in sys.modules
+    release.set()
+
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "warming_up": warming_up and still_warming_up,
+    "root_status": root_status,
+    "webhook_status": webhook_status,
+    "sklearn_loaded": sklearn_loaded,
+}))
+"""
+@pytest.fixture(scope="module")
+def startup_report(tmp_path_factory):
+    """Runs the startup script once in a fresh interpreter; every test checks the same report."""
+    tmp_path = tmp_path_factory.mktemp("startup")
+    env = dict(os.environ, GITHUB_TOKEN="test-secret", STORAGE_FILE=str(tmp_path / "startup.json"),
+               WEBHOOK_LOG_FILE=str(tmp_path / "webhooks.db"))
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_root_and_webhook_served_during_model_warm_up(startup_report):
+    assert startup_report["warming_up"]
+    assert startup_report["root_status"] == 200
+    assert startup_report["webhook_status"] == 200
+    assert not startup_report["sklearn_loaded"]
+
+def test_import_time_budget(startup_report):
+    assert startup_report["import_seconds"] < IMPORT_BUDGET_SECONDS, (
+        f"Importing src.main took {startup_report['import_seconds']:.2f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+    )
@@ -0,0 +1,142 @@
+import os
+from sqlalchemy import text
+from src.storage import Storage, PartitionedStorage
+
+def make_issue(issue_id, number, repository, score, status="triaged", label="bug"):
+    return {
+        "id": issue_id,
+        "number": number,
+        "title": f"Issue {issue_id}",
+        "body": "",
+        "state": "open",
+        "repository": repository,
+        "status": status,
+        "predicted_label": label,
+        "priority_score": score,
+    }
+
+ISSUES = [
+    make_issue(1, 1, "owner/a", 10),
+    make_issue(2, 1, "owner/b", 50),
+    make_issue(3, 2, "owner/a", 30, status="new", label=None),
+    make_issue(4, 2, "owner/b", 20),
+    make_issue(5, 3, "owner/c", 40),
+]
+
+def test_issue_numbers_are_unique_per_repository_only(tmp_path):
+    storage = Storage(str(tmp_path / "single.db"))
+    storage.bulk_upsert(ISSUES)
+    assert len(storage.load_data()) == 5
+    assert [item["id"] for item in storage.load_data(repository="owner/a")] == [1, 3]
+
+def test_single_storage_queries(tmp_path):
+    storage = Storage(str(tmp_path / "single.db"))
+    storage.bulk_upsert(ISSUES)
+
+    total, items = storage.query_issues(limit=2, offset=1)
+    assert total == 5
+    assert [item["id"] for item in items] == [5, 3]
+
+    total, items = storage.query_issues(status="triaged", min_score=20)
+    assert total == 3
+    assert [item["id"] for item in items] == [2, 5, 4]
+
+    stats = storage.stats()
+    assert stats["total"] == 5
+    assert stats["status_counts"] == {"triaged": 4, "new": 1}
+    assert stats["label_counts"] == {"bug": 4, "unlabeled": 1}
+
+def test_partitioned_storage_routes_and_merges(partitioned_storage):
+    storage = partitioned_storage
+    partition_dir = storage.partition_dir
+    storage.bulk_upsert(ISSUES)
+    storage.save_issue_result(6, make_issue(6, 1, None, 35))
+
+    assert sorted(os.listdir(partition_dir)) == ["_unassigned.db", "owner__a.db", "owner__b.db", "owner__c.db"]
+    assert [item["id"] for item in storage.partition("owner/a").load_data()] == [1, 3]
+
+    # Fan-out with a k-way merge matches a global sort
+    total, items = storage.query_issues(limit=3, offset=1)
+    assert total == 6
+    assert [item["id"] for item in items] == [5, 6, 3]
+
+    total, items = storage.query_issues(repository="owner/b")
+    assert total == 2
+    assert [item["id"] for item in items] == [2, 4]
+    assert storage.query_issues(repository="owner/missing") == (0, [])
+
+    stats = storage.stats()
+    assert stats["total"] == 6
+    assert stats["status_counts"]["new"] == 1
+    assert storage.stats("owner/c")["total"] == 1
+
+    assert storage.get_issue(4)["repository"] == "owner/b"
+    assert storage.get_issue(999) is None
+
+    # Partitions are rediscovered on restart
+    reopened = PartitionedStorage(partition_dir=partition_dir)
+    assert len(reopened.load_data()) == 6
+
+def test_issue_moves_when_repository_is_filled_in(partitioned_storage):
+    storage = partitioned_storage
+    storage.save_issue_result(1, make_issue(1, 1, None, 10))
+    storage.bulk_save([make_issue(2, 2, None, 20)])
+
+    # Sync writes back only the repository for issues that lacked one
+    storage.bulk_save([{"id": 1, "repository": "owner/a"}, {"id": 2, "repository": "owner/a"}])
+    assert storage.partition(None).load_data() == []
+    assert [item["id"] for item in storage.load_data()] == [1, 2]
+    assert storage.get_issue(2)["title"] == "Issue 2"
+    assert storage.stats()["total"] == 2
+
+    storage.save_issue_result(1, make_issue(1, 1, "owner/b", 10))
+    assert [item["id"] for item in storage.load_data("owner/a")] == [2]
+    assert [item["id"] for item in storage.load_data("owner/b")] == [1]
+
+    storage.bulk_upsert([make_issue(2, 2, "owner/b", 20)])
+    assert storage.load_data("owner/a") == []
+    assert storage.stats()["total"] == 2
+
+def test_partitions_created_by_another_process_are_seen(partitioned_storage):
+    other = PartitionedStorage(partition_dir=partitioned_storage.partition_dir)
+    other.bulk_upsert(ISSUES)
+
+    assert partitioned_storage.stats("owner/a")["total"] == 2
+    assert partitioned_storage.stats()["total"] == 5
+    assert partitioned_storage.get_issue(5)["repository"] == "owner/c"
+
+def test_migrate_from_main(partitioned_storage):
+    storage = partitioned_storage
+    storage.main.bulk_upsert(ISSUES)
+    storage.bulk_upsert([make_issue(1, 1, "owner/a", 99)]) # Written after partitioning; kept
+
+    assert storage.migrate_from_main(batch_size=2) == 4
+    assert storage.main.load_data() == []
+    assert storage.stats()["total"] == 5
+    assert storage.get_issue(1)["priority_score"] == 99
+    assert storage.migrate_from_main() == 0
+
+def test_writes_and_lookups_use_the_location_index(partitioned_storage, monkeypatch):
+    storage = partitioned_storage
+    storage.bulk_upsert(ISSUES)
+
+    def no_fan_out(*args, **kwargs):
+        raise AssertionError("searched every partition")
+    monkeypatch.setattr(storage, "_targets", no_fan_out)
+
+    storage.save_issue_result(2, make_issue(2, 1, "owner/b", 55))
+    assert storage.get_issue(2)["priority_score"] == 55
+    assert storage.get_issue(999) is None
+
+    # Partial updates without a repository stay in the issue's partition
+    storage.bulk_save([{"id": 5, "status": "closed"}])
+    assert storage.partition("owner/c").get_issue(5)["status"] == "closed"
+    assert storage.partition(None, create=False) is None
+
+def test_location_index_is_rebuilt_for_existing_partitions(partitioned_storage):
+    partitioned_storage.bulk_upsert(ISSUES)
+    with partitioned_storage.engine.begin() as conn:
+        conn.execute(text("DELETE FROM issue_locations"))
+
+    reopened = PartitionedStorage(partition_dir=partitioned_storage.partition_dir)
+    assert reopened.get_issue(4)["repository"] == "owner/b"
@@ -0,0 +1,126 @@
+import hashlib
+import hmac
+import json
+import sqlite3
+import time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+def issue_event(issue_id, title, updated_at, action="edited"):
+    payload = {
+        "action": action,
+        "issue": {"id": issue_id, "number": issue_id, "title": title, "body": None,
+                  "state": "open", "updated_at": updated_at},
+        "repository": {"full_name": "owner/repo"},
+    }
+    return json.dumps(payload).encode()
+
+def test_append_dedupes_on_delivery_id(webhook_log):
+    log = webhook_log
+    assert log.append(issue_event(1, "a", "2024-01-01T00:00:00Z"), delivery_id="d1", event="issues")
+    assert not log.append(issue_event(1, "a", "2024-01-01T00:00:00Z"), delivery_id="d1", event="issues")
+    assert log.pending_count() == 1
+
+def test_drain_coalesces_edits_per_issue(webhook_log):
+    log = webhook_log
+    log.append(issue_event(1, "first", "2024-01-01T00:00:01Z", action="opened"), "d1", "issues")
+    log.append(issue_event(1, "third", "2024-01-01T00:00:03Z"), "d2", "issues")
+    log.append(issue_event(1, "second", "2024-01-01T00:00:02Z"), "d3", "issues")
+    log.append(issue_event(2, "other", "2024-01-01T00:00:01Z"), "d4", "issues")
+    log.append(b'{"zen": "Keep it logically awesome."}', "d5", "ping")
+
+    batches = []
+    assert log.drain(batches.append) == 2
+    issues = {issue["id"]: issue for issue in batches[0]}
+    assert issues[1]["title"] == "third"
+    assert issues[1]["repository"] == "owner/repo"
+    assert issues[2]["title"] == "other"
+    assert log.pending_count() == 0
+
+def test_failed_batch_stays_pending(webhook_log):
+    log = webhook_log
+    log.append(issue_event(1, "a", "2024-01-01T00:00:00Z"), "d1", "issues")
+
+    def crash(issues):
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        log.drain(crash)
+    assert log.pending_count() == 1
+
+    batches = []
+    assert log.drain(batches.append) == 1
+
+def test_log_uses_wal(webhook_log):
+    with webhook_log.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+def test_log_tables_stay_out_of_issue_database(isolated_app):
+    from src import main
+    with main.get_storage().engine.connect() as conn:
+        tables = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    assert "issues" in tables
+    assert not tables & {"webhook_events", "webhook_issue_versions"}
+
+def test_older_event_in_later_batch_is_skipped(webhook_log):
+    webhook_log.append(issue_event(1, "newer", "2024-01-01T00:00:05Z"), "d1", "issues")
+    webhook_log.append(issue_event(1, "older", "2024-01-01T00:00:01Z"), "d2", "issues")
+    webhook_log.append(issue_event(1, "newest", "2024-01-01T00:00:09Z"), "d3", "issues")
+
+    batches = []
+    assert webhook_log.drain(batches.append, batch_size=1) == 2
+    assert [[issue["title"] for issue in batch] for batch in batches] == [["newer"], ["newest"]]
+    assert webhook_log.pending_count() == 0
+
+def post_webhook(client, body, delivery_id):
+    signature = "sha256=" + hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+    return client.post("/webhook", content=body, headers={
+        "X-Hub-Signature-256": signature, "X-GitHub-Event": "issues", "X-GitHub-Delivery": delivery_id,
+    })
+
+def test_locked_log_returns_retryable_status(monkeypatch, webhook_log):
+    from src import main
+    from src.config import Config
+
+    def locked(*args, **kwargs):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(Config, "GITHUB_TOKEN", "secret")
+    monkeypatch.setattr(webhook_log, "append", locked)
+    monkeypatch.setattr(main, "get_webhook_log", lambda: webhook_log)
+
+    response = post_webhook(TestClient(main.app), issue_event(1, "a", "2024-01-01T00:00:00Z"), "d1")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+def test_ack_does_not_wait_on_issue_database(monkeypatch, isolated_app):
+    from src import main
+    from src.config import Config
+
+    monkeypatch.setattr(Config, "GITHUB_TOKEN", "secret")
+    monkeypatch.setattr(Config, "JOB_WORKERS", 0)
+    with TestClient(isolated_app) as client:
+        storage = main.get_storage()
+        lock = sqlite3.connect(storage.engine.url.database, isolation_level=None)
+        lock.execute("BEGIN EXCLUSIVE")
+        try:
+            started = time.perf_counter()
+            response = post_webhook(client, issue_event(1, "a", "2024-01-01T00:00:00Z"), "d1")
+            elapsed = time.perf_counter() - started
+        finally:
+            lock.rollback()
+            lock.close()
+        assert response.status_code == 200
+        assert elapsed < 1.0
+
+        # The sweeper queues the job once the issue database is free again
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            with storage.engine.connect() as conn:
+                if conn.execute(text("SELECT COUNT(*) FROM jobs WHERE kind = 'webhook'")).scalar():
+                    break
+            time.sleep(0.1)
+        else:
+            pytest.fail("webhook job was never queued")